@@ -0,0 +1,92 @@
+"""Services layer: info post-processing, format grouping and downloads from the local stand-in"""
+import os
+import time
+from benchmarks.harness import Benchmark
+from benchmarks.fixtures import load_info, replay, with_expiry, ReplayYDL
+from benchmarks.standin import MediaServer
+from src.config.app import Config
+
+YOUTUBE_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+SHORTS_URL = 'https://www.youtube.com/shorts/dQw4w9WgXcQ'
+FACEBOOK_URL = 'https://www.facebook.com/watch/?v=1234567890123456'
+TIKTOK_URL = 'https://www.tiktok.com/@catlover/video/7350000000000000000'
+
+def _replayed(module, info, fn):
+    def run():
+        with replay(module, info):
+            fn()
+    return run
+
+def benchmarks():
+    from src.server.services import youtube, facebook, tiktok, download, streaming
+    from src.server.utils.ffmpegRegistry import get_capabilities
+    get_capabilities()
+
+    youtube_info = load_info('youtube')
+    facebook_info = load_info('facebook')
+    tiktok_info = load_info('tiktok')
+
+    # Cache metadata đã có sẵn: đo đường trả về khi cache hit
+    with replay(youtube, youtube_info):
+        youtube.get_youtube_info(YOUTUBE_URL)
+
+    items = [
+        Benchmark('services.youtube.info_postprocess',
+                  _replayed(youtube, youtube_info, lambda: youtube._fetch_youtube_info(YOUTUBE_URL)), number=200),
+        Benchmark('services.youtube.info_postprocess_shorts',
+                  _replayed(youtube, youtube_info, lambda: youtube._fetch_youtube_info(SHORTS_URL)), number=200),
+        Benchmark('services.facebook.info_postprocess',
+                  _replayed(facebook, facebook_info, lambda: facebook._fetch_facebook_info(FACEBOOK_URL)), number=500),
+        Benchmark('services.tiktok.info_postprocess',
+                  _replayed(tiktok, tiktok_info, lambda: tiktok._fetch_tiktok_info(TIKTOK_URL)), number=500),
+        Benchmark('services.download.preview_postprocess',
+                  _replayed(download, youtube_info, lambda: download._fetch_video_info(YOUTUBE_URL, 'youtube')), number=200),
+        Benchmark('services.youtube.format_grouping', _format_grouping(youtube_info), number=1000),
+        Benchmark('services.youtube.info_cache_hit',
+                  lambda: youtube.get_youtube_info(YOUTUBE_URL), number=200),
+        Benchmark('services.infoStore.preview_then_download', _reuse_benchmark(download, youtube_info), number=50),
+        Benchmark('services.streaming.fill_64mb', _fill_benchmark(streaming), repeat=3, requires=('yt_dlp',)),
+    ]
+    return items
+
+def _format_grouping(info):
+    """The quality ladder part of _fetch_youtube_info, without the rest of the response"""
+    from src.server.utils.formatTable import FormatTable, quality_ladder, bitrate_label
+
+    def run():
+        table = FormatTable(info['formats'])
+        best_formats = table.best_per_height(muxed=True, sized=True)
+        quality_ladder(table, best_formats, lambda height, fmt, tbr: f"{height}p{bitrate_label(tbr)}")
+        [table.detail(i) for i in best_formats.values()]
+
+    return run
+
+def _reuse_benchmark(download, info):
+    """Preview then download start of one video; the download must reuse the preview's saved info"""
+    from src.server.services.infoStore import process_info, load_info as load_saved_info
+    info = with_expiry(info, time.time() + 6 * 3600)
+
+    def run():
+        with replay(download, info):
+            download._fetch_video_info(YOUTUBE_URL, 'youtube')
+        assert load_saved_info('youtube', YOUTUBE_URL) is not None, "preview did not save its info"
+        process_info(ReplayYDL(info), 'youtube', YOUTUBE_URL, download=False)
+
+    return run
+
+def _fill_benchmark(streaming):
+    """Time a stream-through fill of 64 MB from the local stand-in, including the reader"""
+    size = 64 * 1024 * 1024
+
+    def run():
+        with MediaServer() as server:
+            path = os.path.join(Config.CACHE_FOLDER, 'bench-fill.mp4')
+            fill = streaming.CacheFill(path, size)
+            info = {'url': server.url(size), 'http_headers': {}}
+            opts = {'quiet': True, 'no_warnings': True}
+            streaming._fill(path, fill, 'generic', opts, info, lambda: None)
+            received = sum(len(chunk) for chunk in fill.read())
+            assert received == size, f"read {received} of {size} bytes"
+            os.remove(path)
+
+    return run
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Startup: time to first request of a fresh process and of a worker forked after warm-up"""
+import os
+import sys
+import subprocess
+from benchmarks.harness import Benchmark
+from src.config.app import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tiến trình con dùng cùng workspace tạm với bộ benchmark
+_WORKSPACE = """
+from src.config.app import Config
+Config.STATE_DB_PATH = {state_db!r}
+Config.DB_PATH = {app_db!r}
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + Config.DB_PATH
+Config.CACHE_FOLDER = {cache!r}
+"""
+
+_FIRST_REQUEST = """
+from src.server.index import app
+app.test_client().get('/')
+"""
+
+_FIRST_YDL = """
+from src.server.services.ydlPool import borrow_ydl
+with borrow_ydl('youtube', {'quiet': True}, 'info') as ydl:
+    ydl.get_info_extractor('Youtube')
+"""
+
+def _child(script):
+    code = _WORKSPACE.format(
+        state_db=Config.STATE_DB_PATH,
+        app_db=Config.DB_PATH,
+        cache=Config.CACHE_FOLDER
+    ) + script + "\nimport os\nos._exit(0)\n"
+
+    def run():
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return run
+
+def _forked(script):
+    """Time a worker forked from this (warmed-up) process until it has served the script"""
+    def run():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                exec(script, {})
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+    return run
+
+def benchmarks():
+    items = [
+        # Import app + phục vụ request đầu tiên, yt-dlp chưa được nạp
+        Benchmark('startup.first_request', _child(_FIRST_REQUEST), repeat=5, requires=('flask',)),
+        Benchmark('startup.import_services',
+                  _child('import src.server.services.jobs, src.server.services.streaming, src.server.services.batch'),
+                  repeat=5),
+        # Lần đầu mượn YoutubeDL trong một tiến trình mới: trả giá nạp yt-dlp
+        Benchmark('startup.first_ydl_cold', _child(_FIRST_YDL), repeat=5, requires=('yt_dlp',)),
+    ]
+
+    if hasattr(os, 'fork'):
+        items.append(Benchmark(
+            'startup.first_ydl_forked',
+            _forked(_FIRST_YDL),
+            repeat=5,
+            setup=_warm_up,
+            requires=('yt_dlp',)
+        ))
+    return items
+
+def _warm_up():
+    from src.server.services.ydlPool import warm_up
+    warm_up()
\ No newline at end of file
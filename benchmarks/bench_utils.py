@@ -0,0 +1,61 @@
+"""Utils layer: cache keys, URL detection/validation over large corpora and cache eviction"""
+import os
+import shutil
+from benchmarks.harness import Benchmark
+from benchmarks.fixtures import url_corpus, create_cache_files, load_info
+from src.config.app import Config
+
+CORPUS_SIZE = 100000
+CACHE_FILES = 100000
+
+def benchmarks():
+    from src.server.utils.fileManager import get_cache_path, clean_expired_cache
+    from src.server.utils.cacheCatalog import sync_catalog, clear_catalog
+    from src.server.utils.validators import is_valid_url
+    from src.server.utils.formatTable import FormatTable
+    from src.server.utils.videoIds import canonical_video_ref
+    from src.server.services.download import detect_platform
+    from src.server.services.youtube import validate_youtube_url
+    from src.server.services.facebook import validate_facebook_url
+    from src.server.services.tiktok import validate_tiktok_url
+
+    corpus = url_corpus(CORPUS_SIZE)
+    valid = [url for url in corpus if url.startswith('http')][:10000]
+    fmt = 'bestvideo[height<=1080]+bestaudio/best[height<=1080]/best'
+
+    def over(fn, urls):
+        def run():
+            for url in urls:
+                fn(url)
+        return run
+
+    youtube_formats = load_info('youtube')['formats']
+
+    def format_table():
+        table = FormatTable(youtube_formats)
+        table.best_per_height(muxed=True, sized=True)
+
+    def fresh_cache():
+        # Mỗi lần đo dựng lại 100k file và catalog, phần này không tính giờ
+        clear_catalog()
+        shutil.rmtree(Config.CACHE_FOLDER, ignore_errors=True)
+        os.makedirs(Config.CACHE_FOLDER)
+        create_cache_files(CACHE_FILES)
+
+    def fresh_catalog():
+        fresh_cache()
+        sync_catalog()
+
+    return [
+        Benchmark('utils.get_cache_path', over(lambda url: get_cache_path(url, fmt, 'mp4_planner'), valid),
+                  repeat=5, items=len(valid)),
+        Benchmark('utils.canonical_video_ref', over(canonical_video_ref, valid), repeat=5, items=len(valid)),
+        Benchmark('utils.format_table_youtube', format_table, number=1000),
+        Benchmark('utils.is_valid_url', over(is_valid_url, corpus), repeat=5, items=len(corpus)),
+        Benchmark('services.detect_platform', over(detect_platform, corpus), repeat=5, items=len(corpus)),
+        Benchmark('services.validate_youtube_url', over(validate_youtube_url, corpus), repeat=5, items=len(corpus)),
+        Benchmark('services.validate_facebook_url', over(validate_facebook_url, corpus), repeat=5, items=len(corpus)),
+        Benchmark('services.validate_tiktok_url', over(validate_tiktok_url, corpus), repeat=5, items=len(corpus)),
+        Benchmark('utils.sync_catalog_100k', sync_catalog, repeat=3, setup=fresh_cache, items=CACHE_FILES),
+        Benchmark('utils.clean_expired_cache_100k', clean_expired_cache, repeat=3, setup=fresh_catalog, items=CACHE_FILES),
+    ]
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Per-call YoutubeDL setup overhead: a fresh instance per call vs the pool.
+
+Chạy từ thư mục gốc: python -m benchmarks.bench_ydl_pool
+Không cần mạng: mỗi lần gọi chỉ dựng YoutubeDL, nạp extractor và chọn format.
+"""
+import time
+import statistics
+from src.config.constants import DEFAULT_USER_AGENT
+from src.server.services.postprocess import build_downloader
+from src.server.services.ydlPool import borrow_ydl, clear_pool, get_pool_stats
+
+ITERATIONS = 50
+
+PROFILES = {
+    'youtube': {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': True,
+        'user_agent': DEFAULT_USER_AGENT,
+        'format': 'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080]',
+        'merge_output_format': 'mp4',
+        'mp4_planner': True,
+    },
+    'tiktok': {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': True,
+        'user_agent': DEFAULT_USER_AGENT,
+        'format': 'best',
+    },
+}
+
+# Tuỳ chọn của services.download._fetch_video_info: đường /api/preview thật
+PREVIEW_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    'format_sort': ['res', 'ext:mp4:m4a'],
+    'user_agent': DEFAULT_USER_AGENT,
+    'cookiefile': None,
+}
+
+EXTRACTORS = {'youtube': 'Youtube', 'tiktok': 'TikTok'}
+
+def _use(ydl, platform):
+    # Những gì một lần gọi thật cần trước khi ra mạng
+    ydl.get_info_extractor(EXTRACTORS[platform])
+
+def bench_fresh(platform, ydl_opts):
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        with build_downloader(ydl_opts) as ydl:
+            _use(ydl, platform)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def bench_pooled(platform, ydl_opts):
+    timings = []
+    for i in range(ITERATIONS):
+        started = time.perf_counter()
+        with borrow_ydl(platform, dict(ydl_opts, outtmpl=f'bench-{i}.%(ext)s'), 'bench') as ydl:
+            _use(ydl, platform)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def _report(label, timings):
+    print(
+        f"  {label:<7} mean {statistics.mean(timings) * 1000:8.2f} ms   "
+        f"median {statistics.median(timings) * 1000:8.2f} ms   "
+        f"max {max(timings) * 1000:8.2f} ms"
+    )
+
+def main():
+    for platform, ydl_opts in PROFILES.items():
+        clear_pool()
+        print(f"{platform} ({ITERATIONS} calls)")
+        _report('fresh', bench_fresh(platform, ydl_opts))
+        _report('pooled', bench_pooled(platform, ydl_opts))
+    print(f"pool: {get_pool_stats()}")
+
+def benchmarks():
+    from benchmarks.harness import Benchmark
+
+    items = []
+    for platform, ydl_opts in PROFILES.items():
+        def fresh(platform=platform, ydl_opts=ydl_opts):
+            with build_downloader(ydl_opts) as ydl:
+                _use(ydl, platform)
+
+        def pooled(platform=platform, ydl_opts=ydl_opts):
+            with borrow_ydl(platform, ydl_opts, 'bench') as ydl:
+                _use(ydl, platform)
+
+        def preview(platform=platform):
+            with borrow_ydl(platform, PREVIEW_OPTS, 'preview') as ydl:
+                _use(ydl, platform)
+
+        items.append(Benchmark(f'ydl_pool.{platform}.fresh', fresh, number=ITERATIONS, requires=('yt_dlp',)))
+        items.append(Benchmark(f'ydl_pool.{platform}.pooled', pooled, number=ITERATIONS, setup=clear_pool, requires=('yt_dlp',)))
+        items.append(Benchmark(f'ydl_pool.{platform}.preview', preview, number=ITERATIONS, setup=clear_pool, requires=('yt_dlp',)))
+    return items
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Recorded info dicts, synthetic URL corpora and an isolated workspace for benchmarks"""
+import os
+import re
+import json
+import time
+import random
+import string
+import tempfile
+from contextlib import contextmanager
+from src.config.app import Config
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load_info(platform):
+    """Load a recorded yt-dlp info dict (see record_fixture.py)"""
+    with open(os.path.join(FIXTURE_DIR, f'{platform}_info.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def setup_workspace():
+    """Point every database and the cache folder at a fresh temporary directory"""
+    workspace = tempfile.mkdtemp(prefix='vd-bench-')
+    Config.STATE_DB_PATH = os.path.join(workspace, 'state.db')
+    Config.DB_PATH = os.path.join(workspace, 'app.db')
+    Config.CACHE_FOLDER = os.path.join(workspace, 'cache')
+    os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
+    # Bản ghi phát lại không gọi tới nền tảng: không giới hạn tốc độ
+    Config.RATE_LIMIT_ENABLED = False
+    return workspace
+
+def with_expiry(info, expires_at):
+    """Copy of an info dict whose format URLs expire at expires_at (recorded ones are long expired)"""
+    data = re.sub(r'([?&/]expire[=/])\d+', lambda m: f"{m.group(1)}{int(expires_at)}", json.dumps(info))
+    return json.loads(data)
+
+class ReplayYDL:
+    """Stands in for a borrowed YoutubeDL and returns a recorded info dict"""
+
+    def __init__(self, info):
+        self.info = info
+
+    def extract_info(self, url, download=False):
+        return self.info
+
+    def process_ie_result(self, info, download=True):
+        return info
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys=False):
+        # Bản sao JSON như YoutubeDL.sanitize_info để save_info đo đúng chi phí
+        return json.loads(json.dumps(info))
+
+@contextmanager
+def replay(module, info):
+    """Make module.borrow_ydl lend a ReplayYDL while the block runs"""
+    @contextmanager
+    def borrow_ydl(platform, ydl_opts, profile='default'):
+        yield ReplayYDL(info)
+
+    original = module.borrow_ydl
+    module.borrow_ydl = borrow_ydl
+    try:
+        yield
+    finally:
+        module.borrow_ydl = original
+
+def _token(rnd, n, alphabet=string.ascii_letters + string.digits + '-_'):
+    return ''.join(rnd.choice(alphabet) for _ in range(n))
+
+def url_corpus(size=100000, seed=1):
+    """Mixed YouTube/Facebook/TikTok/other URLs in the variants users paste"""
+    rnd = random.Random(seed)
+    makers = [
+        lambda: f"https://www.youtube.com/watch?v={_token(rnd, 11)}",
+        lambda: f"https://youtu.be/{_token(rnd, 11)}?si={_token(rnd, 16)}",
+        lambda: f"https://m.youtube.com/watch?v={_token(rnd, 11)}&t={rnd.randint(1, 600)}s&feature=share",
+        lambda: f"https://www.youtube.com/shorts/{_token(rnd, 11)}",
+        lambda: f"https://www.youtube.com/watch?v={_token(rnd, 11)}&list=PL{_token(rnd, 32)}&index={rnd.randint(1, 50)}",
+        lambda: f"https://www.facebook.com/watch/?v={rnd.randint(10 ** 14, 10 ** 16)}",
+        lambda: f"https://www.facebook.com/{_token(rnd, 10)}/videos/{rnd.randint(10 ** 14, 10 ** 16)}/",
+        lambda: f"https://fb.watch/{_token(rnd, 10)}/",
+        lambda: f"https://www.facebook.com/reel/{rnd.randint(10 ** 14, 10 ** 16)}?mibextid={_token(rnd, 6)}",
+        lambda: f"https://www.tiktok.com/@{_token(rnd, 8).lower()}/video/{rnd.randint(7 * 10 ** 18, 8 * 10 ** 18)}?is_from_webapp=1&sender_device=pc",
+        lambda: f"https://vm.tiktok.com/{_token(rnd, 9)}/",
+        lambda: f"https://example.com/{_token(rnd, 12)}/video.mp4",
+        lambda: f"not a url {_token(rnd, 20)}",
+    ]
+    return [rnd.choice(makers)() for _ in range(size)]
+
+def create_cache_files(count=100000, expired_ratio=0.5, seed=1):
+    """Fill the cache folder with small files, about expired_ratio of them past CACHE_EXPIRY"""
+    rnd = random.Random(seed)
+    now = time.time()
+    for i in range(count):
+        path = os.path.join(Config.CACHE_FOLDER, f"youtube-{_token(rnd, 11)}-{i:012x}.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'\0' * rnd.randint(0, 64))
+        age = Config.CACHE_EXPIRY * 2 if rnd.random() < expired_ratio else rnd.randint(0, Config.CACHE_EXPIRY // 2)
+        os.utime(path, (now - age, now - age))
\ No newline at end of file
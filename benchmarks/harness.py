@@ -0,0 +1,124 @@
+"""Timing, result files and regression comparison for the benchmark suite"""
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+class Benchmark:
+    """One timed function.
+
+    fn() is called `number` times per repetition; setup() (not timed) runs
+    before every repetition. requires lists modules that must be importable.
+    """
+
+    def __init__(self, name, fn, number=1, repeat=5, setup=None, items=None, requires=()):
+        self.name = name
+        self.fn = fn
+        self.number = number
+        self.repeat = repeat
+        self.setup = setup
+        self.items = items
+        self.requires = requires
+
+def _missing(modules):
+    missing = []
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError:
+            missing.append(module)
+    return missing
+
+def measure(benchmark):
+    """Run a benchmark and return its timing statistics (seconds per call), or the error it raised"""
+    missing = _missing(benchmark.requires)
+    if missing:
+        return {'skipped': f"missing {', '.join(missing)}"}
+
+    timings = []
+    try:
+        for _ in range(benchmark.repeat):
+            if benchmark.setup:
+                benchmark.setup()
+            started = time.perf_counter()
+            for _ in range(benchmark.number):
+                benchmark.fn()
+            timings.append((time.perf_counter() - started) / benchmark.number)
+    except Exception as e:
+        # Một benchmark lỗi không dừng cả bộ đo
+        return {'error': f"{type(e).__name__}: {e}"}
+
+    timings.sort()
+    result = {
+        'number': benchmark.number,
+        'repeat': benchmark.repeat,
+        'min': timings[0],
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max': timings[-1],
+    }
+    if benchmark.items:
+        # Thông lượng theo số phần tử xử lý mỗi lần gọi (URL, file, ...)
+        result['items'] = benchmark.items
+        result['items_per_second'] = benchmark.items / result['median'] if result['median'] else None
+    return result
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=5
+        ).stdout.decode().strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_all(benchmarks, name_filter=None, log=print):
+    """Run benchmarks (optionally only names containing name_filter) and return the results document"""
+    results = {}
+    for benchmark in benchmarks:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        result = measure(benchmark)
+        results[benchmark.name] = result
+        if 'skipped' in result:
+            log(f"{benchmark.name:<40} skipped ({result['skipped']})")
+        elif 'error' in result:
+            log(f"{benchmark.name:<40} failed ({result['error']})")
+        else:
+            log(f"{benchmark.name:<40} median {result['median'] * 1000:10.3f} ms   p95 {result['p95'] * 1000:10.3f} ms")
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+def save_results(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+def compare(document, baseline_path, threshold=0.10, log=print):
+    """Compare medians with a previous results file, returns names that got slower than threshold"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, result in document['results'].items():
+        before = baseline.get(name)
+        if 'median' not in result or not before or 'median' not in before:
+            continue
+        change = result['median'] / before['median'] - 1 if before['median'] else 0.0
+        marker = ''
+        if change > threshold:
+            marker = '  <-- regression'
+            regressions.append(name)
+        log(f"{name:<40} {before['median'] * 1000:10.3f} -> {result['median'] * 1000:10.3f} ms ({change:+.1%}){marker}")
+    return regressions
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""Record a live yt-dlp info dict as a benchmark fixture (needs internet).
+
+    python -m benchmarks.record_fixture youtube https://www.youtube.com/watch?v=...
+"""
+import os
+import sys
+import json
+import yt_dlp
+from benchmarks.fixtures import FIXTURE_DIR
+
+def record(platform, url):
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'noplaylist': True}) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+    path = os.path.join(FIXTURE_DIR, f'{platform}_info.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Saved {len(info.get('formats') or [])} formats to {path}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+    record(sys.argv[1], sys.argv[2])
\ No newline at end of file
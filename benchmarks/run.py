@@ -0,0 +1,64 @@
+"""Run the offline benchmark suite and save the results as JSON.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.run
+    python -m benchmarks.run --filter utils --compare benchmarks/results/baseline.json
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import importlib
+from benchmarks.harness import run_all, save_results, compare
+from benchmarks.fixtures import setup_workspace
+
+MODULES = (
+    'benchmarks.bench_utils',
+    'benchmarks.bench_services',
+    'benchmarks.bench_ydl_pool',
+    'benchmarks.bench_startup',
+)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def collect(log=print):
+    """Import every benchmark module; modules whose dependencies are missing are skipped"""
+    benchmarks = []
+    for name in MODULES:
+        try:
+            benchmarks.extend(importlib.import_module(name).benchmarks())
+        except ImportError as e:
+            log(f"{name:<40} skipped ({e})")
+    return benchmarks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--compare', help='previous results file to compare medians with')
+    parser.add_argument('--threshold', type=float, default=0.10, help='slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    workspace = setup_workspace()
+    try:
+        document = run_all(collect(), args.filter)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    save_results(document, output)
+    print(f"Saved results to {output}")
+
+    failed = [name for name, result in document['results'].items() if 'error' in result]
+    if failed:
+        print(f"{len(failed)} benchmark(s) failed: {', '.join(failed)}")
+
+    if args.compare:
+        regressions = compare(document, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Local HTTP stand-in that serves fixture media, so downloads can be timed offline"""
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    # /media/<bytes>.mp4 trả về <bytes> byte dữ liệu, có hỗ trợ Range
+    def do_GET(self):
+        match = re.fullmatch(r'/media/(\d+)\.(\w+)', self.path.split('?')[0])
+        if not match:
+            self.send_error(404)
+            return
+
+        size = int(match.group(1))
+        start, end = 0, size - 1
+        status = 200
+        range_match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if range_match:
+            start = int(range_match.group(1))
+            end = min(int(range_match.group(2) or size - 1), size - 1)
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+
+        chunk = self.server.payload
+        remaining = end - start + 1
+        while remaining > 0:
+            block = chunk[:min(len(chunk), remaining)]
+            self.wfile.write(block)
+            remaining -= len(block)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+class MediaServer:
+    """Context manager running the stand-in on a free localhost port"""
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _MediaHandler)
+        self.server.daemon_threads = True
+        self.server.payload = bytes(range(256)) * 256
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def url(self, size, ext='mp4'):
+        return f"http://127.0.0.1:{self.server.server_port}/media/{size}.{ext}"
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
\ No newline at end of file
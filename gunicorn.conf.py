@@ -0,0 +1,38 @@
+"""gunicorn settings: preforked, threaded workers sharing state through SQLite.
+
+    gunicorn -c gunicorn.conf.py src.server.index:app   (or: python serve.py)
+"""
+import os
+
+# Master nạp app và yt-dlp một lần; worker fork ra dùng chung các trang bộ nhớ.
+# Thread nền (job, janitor) chỉ chạy trong worker, không chạy trong master.
+os.environ.setdefault('WARM_UP_YT_DLP', '1')
+os.environ.setdefault('DEFER_BACKGROUND_WORKERS', '1')
+
+from src.config.app import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = 30
+preload_app = True
+
+def when_ready(server):
+    # Connection SQLite mở trong master không được dùng lại sau khi fork
+    from src.server.index import app
+    from src.server.extensions import db
+    from src.server.utils.sqliteStore import close_connections
+    with app.app_context():
+        db.engine.dispose()
+    close_connections()
+
+def on_reload(server):
+    # SIGHUP của master: worker mới fork ra mang capabilities FFmpeg vừa probe lại
+    from src.server.utils.ffmpegRegistry import refresh_capabilities
+    refresh_capabilities()
+
+def post_fork(server, worker):
+    from src.server.index import start_background_workers
+    start_background_workers()
\ No newline at end of file
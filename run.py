@@ -1,4 +1,6 @@
+import os
 from src.server.index import app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Chỉ để phát triển; production dùng serve.py
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
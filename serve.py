@@ -0,0 +1,22 @@
+"""Run the app with a production server.
+
+POSIX: gunicorn with gunicorn.conf.py (preforked, threaded workers).
+Windows: waitress (one process, Config.SERVER_THREADS threads).
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    if os.name == 'posix':
+        config = os.path.join(ROOT, 'gunicorn.conf.py')
+        os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', config, 'src.server.index:app'])
+
+    from waitress import serve
+    from src.config.app import Config
+    from src.server.index import app
+    serve(app, listen=Config.SERVER_BIND, threads=Config.SERVER_THREADS)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
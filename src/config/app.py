@@ -1,5 +1,5 @@
 import os
-import secrets
+from src.config.keys import load_keys
 
 class Config:
     # Base configuration
@@ -14,11 +14,115 @@ class Config:
     DB_PATH = os.path.join(INSTANCE_PATH, DB_NAME)
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LEGACY_DB_PATH = os.path.join(INSTANCE_PATH, 'users.db')  # old app's database (download history)
+    
+    # Shared state database (caches, leases) used by all worker processes
+    STATE_DB_PATH = os.path.join(INSTANCE_PATH, 'state.db')
+    SQLITE_BUSY_TIMEOUT = 5000  # milliseconds
+    # Worker chờ khoá ghi thay vì báo "database is locked"
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT / 1000}}
+    
+    # Logged-in user identities kept in memory by the flask-login user_loader
+    USER_CACHE_TTL = 60  # seconds; bounds staleness after a change made by another worker
+    USER_CACHE_MAX_ENTRIES = 1024
+    
+    # Metadata cache for /api/preview
+    METADATA_CACHE_TTL = 30 * 60  # 30 minutes
+    METADATA_CACHE_MAX_ENTRIES = 5000
+    
+    # Download cache and cookies
+    CACHE_FOLDER = os.path.join(INSTANCE_PATH, 'cache')
+    CACHE_EXPIRY = 24 * 60 * 60  # evict files not accessed for a day
+    MAX_CACHE_SIZE = 10 * 1024 * 1024 * 1024  # 10 GB
+    CACHE_JANITOR_INTERVAL = 60  # seconds between background evictions
+    COOKIE_FILE = os.path.join(BASE_DIR, 'src', 'public', 'cookies.txt')
+    COOKIE_CACHE_FOLDER = os.path.join(INSTANCE_PATH, 'cookies')  # per-platform extracts of COOKIE_FILE
+    
+    # FFmpeg (bundled essentials build is preferred when usable)
+    FFMPEG_BUNDLED_DIR = os.path.join(BASE_DIR, 'ffmpeg-7.1.1-essentials_build')
+    FFMPEG_RECHECK_INTERVAL = 30  # seconds between checks for a refresh by another worker
+    
+    # Admin accounts (comma separated usernames)
+    ADMIN_USERNAMES = {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+    
+    # Background download jobs
+    DOWNLOAD_WORKERS = 4
+    MAX_QUEUED_JOBS = 100
+    JOB_HEARTBEAT_INTERVAL = 15  # seconds
+    JOB_STALE_AFTER = 60  # seconds without heartbeat before another worker takes over
+    
+    # Download history (buffered, group-committed to app.db)
+    HISTORY_FLUSH_ROWS = 50  # rows that trigger an immediate flush
+    HISTORY_FLUSH_INTERVAL = 250  # milliseconds before buffered rows are written anyway
+    
+    # Upstream rate limiting (buckets in constants.RATE_LIMITS)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_OVERRIDES = os.environ.get('RATE_LIMITS', '')  # "platform=rate:burst,..."
+    RATE_LIMIT_MAX_WAIT = 30  # seconds; a longer wait is refused instead of holding the worker
+    
+    # Single-flight leases
+    SINGLE_FLIGHT_LEASE_TTL = 120  # seconds
+    SINGLE_FLIGHT_WAIT_TIMEOUT = 60  # seconds
+    DOWNLOAD_WAIT_TIMEOUT = 30 * 60  # how long to wait for another worker's download
+    
+    # YoutubeDL instance pool
+    YDL_POOL_SIZE = 4  # idle instances kept per (platform, profile, cookie file)
+    YDL_POOL_MAX_AGE = 10 * 60  # seconds before an instance is rebuilt (picks up new cookies)
+    WARM_UP_YT_DLP = os.environ.get('WARM_UP_YT_DLP', '0') == '1'  # import yt-dlp in create_app (preforking masters)
+    
+    # Batch preview
+    BATCH_PREVIEW_MAX_URLS = 50
+    BATCH_PREVIEW_TIMEOUT = 120  # seconds for a whole batch
+    BATCH_PREVIEW_WORKERS = {'youtube': 4, 'facebook': 2, 'tiktok': 2}  # extractions in flight per platform
+    
+    # Stream-through delivery
+    STREAM_CHUNK_SIZE = 256 * 1024  # bytes
+    STREAM_IDLE_TIMEOUT = 60  # seconds without new upstream bytes before giving up
+    
+    # Download progress (SSE)
+    PROGRESS_UPDATES_PER_SECOND = 4  # throttle for writes and pushes
+    PROGRESS_KEEPALIVE = 15  # seconds between SSE keep-alive comments
+    
+    # Transfer auto-tuning (fragment concurrency per platform)
+    TUNING_SAMPLES = 3  # fragmented downloads observed before changing concurrency
+    TUNING_MAX_ERROR_RATE = 0.05  # fragment errors per fragment that halve concurrency
+    TUNING_MIN_BYTES = 4 * 1024 * 1024  # ignore downloads too small to measure throughput
+    TUNING_REFRESH = 30  # seconds a worker keeps the learned settings before re-reading
+    
+    # Prometheus metrics (/metrics)
+    METRICS_PREFIX = 'video_downloader'
+    METRICS_FLUSH_INTERVAL = 5  # seconds between writes of a worker's metrics to state.db
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token required by /metrics when set
+    
+    # Preview info reused by downloads (skips a second extraction)
+    EXTRACTED_INFO_TTL = 3600  # seconds, also capped by the expiry in the format URLs
+    EXTRACTED_INFO_MARGIN = 300  # seconds before URL expiry the saved info stops being used
+    
+    # Per-request sampling profiler (admins: X-Profile: 1 header or ?profile=1)
+    PROFILE_ENABLED = True
+    PROFILE_INTERVAL = 0.005  # seconds between stack samples
+    PROFILE_FOLDER = os.path.join(INSTANCE_PATH, 'profiles')
     
     # Security settings
-    SECRET_KEY = secrets.token_hex(32)
+    # Cùng khoá cho mọi worker (và sau khi khởi động lại): đọc từ biến môi trường
+    # hoặc instance/secret_keys.json, tạo ngẫu nhiên ở lần chạy đầu
+    _keys = load_keys(os.path.join(INSTANCE_PATH, 'secret_keys.json'), ('SECRET_KEY', 'WTF_CSRF_SECRET_KEY'))
+    SECRET_KEY = _keys['SECRET_KEY']
     WTF_CSRF_ENABLED = True
-    WTF_CSRF_SECRET_KEY = secrets.token_hex(32)
+    WTF_CSRF_SECRET_KEY = _keys['WTF_CSRF_SECRET_KEY']
+    
+    # Production server (serve.py / gunicorn.conf.py)
+    SERVER_BIND = os.environ.get('BIND', '127.0.0.1:8000')
+    SERVER_WORKERS = int(os.environ.get('WEB_WORKERS', min(4, os.cpu_count() or 1)))  # preforked processes
+    SERVER_THREADS = int(os.environ.get('WEB_THREADS', 8))  # request threads per process
+    SERVER_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 120))  # seconds before a silent worker is restarted
+    SERVER_MAX_SSE = max(1, SERVER_THREADS // 2)  # progress streams held open per process; other clients poll
+    DEFER_BACKGROUND_WORKERS = os.environ.get('DEFER_BACKGROUND_WORKERS', '0') == '1'  # started per worker after fork
+    
+    # Password hashing (bcrypt on a bounded pool, rehashed on login when the cost changes)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))  # each +1 doubles the time per hash
+    PASSWORD_HASH_WORKERS = 2  # hashes computed at once per worker process
+    PASSWORD_HASH_MAX_PENDING = max(1, SERVER_THREADS // 4)  # running + waiting before 503: at most a quarter of the request threads
     
     # Session configuration
     SESSION_TYPE = 'filesystem'
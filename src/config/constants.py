@@ -26,4 +26,36 @@ PLATFORMS = {
         'domains': ['tiktok.com', 'vm.tiktok.com', 'm.tiktok.com'],
         'name': 'TikTok'
     }
+}
+
+# Upstream request limits per platform: token bucket shared by all worker processes
+# rate = requests per second refilled, burst = requests allowed back to back
+# (override with RATE_LIMITS="youtube=2:10,tiktok=0.5:3")
+RATE_LIMITS = {
+    'youtube': {'rate': 2.0, 'burst': 10},
+    'facebook': {'rate': 1.0, 'burst': 5},
+    'tiktok': {'rate': 1.0, 'burst': 5}
+}
+
+# Transfer tuning per platform: starting fragment concurrency, its bounds and HTTP chunk size
+# (concurrency is only learned from fragmented HLS/DASH downloads; plain HTTP uses the chunk size)
+TRANSFER_TUNING = {
+    'youtube': {
+        'concurrent_fragment_downloads': 4,
+        'min_fragments': 1,
+        'max_fragments': 16,
+        'http_chunk_size': 10 * 1024 * 1024  # tránh bị YouTube giới hạn tốc độ khi tải liền một lượt
+    },
+    'facebook': {
+        'concurrent_fragment_downloads': 4,
+        'min_fragments': 1,
+        'max_fragments': 12,
+        'http_chunk_size': None
+    },
+    'tiktok': {
+        'concurrent_fragment_downloads': 1,
+        'min_fragments': 1,
+        'max_fragments': 4,
+        'http_chunk_size': None
+    }
 }
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import json
+import secrets
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_new(path, keys):
+    """Create the key file unless another process already did; never overwrite it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(keys, f)
+    try:
+        # link() thất bại nếu file đã có: tiến trình tạo trước thắng
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Hệ thống file không hỗ trợ hard link
+        if not os.path.exists(path):
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def load_keys(path, names):
+    """Return key material shared by every worker process.
+
+    Environment variables of the same name win; otherwise the keys are read
+    from path, which is created with random keys on first start.
+    """
+    if all(os.environ.get(name) for name in names):
+        return {name: os.environ[name] for name in names}
+
+    try:
+        keys = _read(path)
+    except FileNotFoundError:
+        _write_new(path, {name: secrets.token_hex(32) for name in names})
+        keys = _read(path)
+
+    missing = [name for name in names if not keys.get(name)]
+    if missing:
+        # Khoá mới được thêm vào cấu hình sau khi file đã tạo
+        keys.update({name: secrets.token_hex(32) for name in missing})
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(keys, f)
+        os.replace(tmp_path, path)
+
+    return {name: os.environ.get(name) or keys[name] for name in names}
\ No newline at end of file
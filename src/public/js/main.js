@@ -186,42 +186,93 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Hàm tải xuống với thêm tham số format_id
     function downloadVideo(url, platform, quality, formatId = null) {
-        // Tạo form để submit
-        const form = document.createElement('form');
-        form.method = 'POST';
-        form.action = '/api/download';
-        
-        // Thêm các input fields
-        const urlInput = document.createElement('input');
-        urlInput.type = 'hidden';
-        urlInput.name = 'url';
-        urlInput.value = url;
-        form.appendChild(urlInput);
-        
-        const platformInput = document.createElement('input');
-        platformInput.type = 'hidden';
-        platformInput.name = 'platform';
-        platformInput.value = platform;
-        form.appendChild(platformInput);
-        
-        const qualityInput = document.createElement('input');
-        qualityInput.type = 'hidden';
-        qualityInput.name = 'quality';
-        qualityInput.value = quality;
-        form.appendChild(qualityInput);
+        const formData = new FormData();
+        formData.append('url', url);
+        formData.append('platform', platform);
+        formData.append('quality', quality);
         
         // Thêm format_id nếu có
         if (formatId) {
-            const formatIdInput = document.createElement('input');
-            formatIdInput.type = 'hidden';
-            formatIdInput.name = 'format_id';
-            formatIdInput.value = formatId;
-            form.appendChild(formatIdInput);
+            formData.append('format_id', formatId);
+        }
+        
+        // Server trả về job ID ngay, video được tải trong nền
+        fetch('/api/download', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(job => {
+            if (job.error) {
+                showError(job.error);
+                return;
+            }
+            waitForJob(job);
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showError('Đã xảy ra lỗi khi tải video');
+        });
+    }
+    
+    // Theo dõi tiến trình qua SSE, trình duyệt cũ thì hỏi trạng thái định kỳ
+    function waitForJob(job) {
+        if (job.events_url && window.EventSource && job.status !== 'finished' && job.status !== 'failed') {
+            const events = new EventSource(job.events_url);
+            events.addEventListener('progress', event => showProgress(JSON.parse(event.data)));
+            events.addEventListener('done', event => {
+                events.close();
+                pollJob(JSON.parse(event.data));
+            });
+            events.onerror = () => {
+                events.close();
+                pollJob(job);
+            };
+            return;
+        }
+        pollJob(job);
+    }
+    
+    // Hiển thị giai đoạn, phần trăm, tốc độ và thời gian còn lại
+    function showProgress(progress) {
+        const progressElement = document.getElementById('download-progress');
+        if (!progressElement) return;
+        
+        const phases = {download: 'Đang tải', merge: 'Đang ghép video và audio', convert: 'Đang chuyển đổi'};
+        let text = phases[progress.phase] || 'Đang xử lý';
+        if (progress.phase === 'download' && progress.total_bytes) {
+            text += ` ${Math.floor(progress.downloaded_bytes * 100 / progress.total_bytes)}%`;
+        }
+        if (progress.speed) {
+            text += ` - ${(progress.speed / 1024 / 1024).toFixed(1)} MB/s`;
+        }
+        if (progress.eta) {
+            text += ` - còn ${formatDuration(Math.round(progress.eta))}`;
+        }
+        progressElement.textContent = text;
+        progressElement.style.display = 'block';
+    }
+    
+    // Hỏi trạng thái job cho đến khi tải xong rồi chuyển sang link file
+    function pollJob(job) {
+        if (job.status === 'finished') {
+            window.location.href = job.result_url;
+            return;
+        }
+        if (job.status === 'failed') {
+            showError(job.error || 'Không thể tải video');
+            return;
         }
         
-        // Thêm form vào document và submit
-        document.body.appendChild(form);
-        form.submit();
+        setTimeout(() => {
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(pollJob)
+                .catch(error => {
+                    console.error('Error:', error);
+                    showError('Mất kết nối khi theo dõi tiến trình tải');
+                });
+        }, 2000);
     }
     
     // Hàm format số lượt xem
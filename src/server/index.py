@@ -5,7 +5,8 @@ import os
 
 from src.config.app import Config
 from src.server.extensions import db
-from src.server.models import User
+from src.server.utils.userCache import load_identity
+from src.server.utils.sqliteStore import configure_engine
 
 def create_app():
     app = Flask(__name__,
@@ -14,6 +15,11 @@ def create_app():
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine)
+        # Cột download_count phải có trước truy vấn User đầu tiên
+        from src.server.services.history import migrate_schema
+        migrate_schema()
     csrf = CSRFProtect()
     csrf.init_app(app)
     
@@ -24,17 +30,66 @@ def create_app():
     
     @login_manager.user_loader
     def load_user(id):
-        return User.query.get(int(id))
+        # Không truy vấn database ở mỗi request đã đăng nhập
+        return load_identity(id)
     
     # Register blueprints
     from src.server.routes.auth import auth
     from src.server.routes.main import main
     from src.server.routes.api import api
+    from src.server.routes.jobs import jobs
+    from src.server.routes.admin import admin
+    from src.server.routes.preview import preview
+    from src.server.routes.stream import stream
+    from src.server.routes.metrics import metrics
     
     app.register_blueprint(auth)
     app.register_blueprint(main)
     app.register_blueprint(api)
+    app.register_blueprint(jobs)
+    app.register_blueprint(admin)
+    app.register_blueprint(preview)
+    app.register_blueprint(stream)
+    app.register_blueprint(metrics)
+    
+    # Admin-only sampling profiler, off unless a request asks for it
+    from src.server.utils.profiler import install_profiler
+    install_profiler(app)
+    
+    # Lịch sử tải của job nền, ghi theo lô
+    from src.server.services.history import record_job
+    from src.server.services.jobs import register_job_listener
+    register_job_listener(record_job)
+    
+    # Hàng đợi băm mật khẩu đầy: trả 503 ngay thay vì giữ worker
+    from src.server.utils.passwords import PasswordHashingBusyError, busy_response
+    app.register_error_handler(PasswordHashingBusyError, busy_response)
+    
+    # Giới hạn tốc độ tới nền tảng: trả 429 kèm Retry-After
+    from src.server.utils.rateLimiter import RateLimitedError, rate_limited_response
+    app.register_error_handler(RateLimitedError, rate_limited_response)
+    
+    # Probe FFmpeg once at startup, refresh on SIGHUP (gunicorn: on_reload) or /api/admin/ffmpeg/refresh
+    from src.server.utils.ffmpegRegistry import get_capabilities, install_refresh_signal
+    get_capabilities()
+    install_refresh_signal()
+    
+    # yt-dlp được nạp khi cần; master của server prefork nạp sẵn để worker dùng chung
+    if Config.WARM_UP_YT_DLP:
+        from src.server.services.ydlPool import warm_up
+        warm_up()
+    
+    # Server prefork khởi động chúng trong từng worker (post_fork)
+    if not Config.DEFER_BACKGROUND_WORKERS:
+        start_background_workers()
     
     return app
 
+def start_background_workers():
+    """Start download workers and cache eviction in the current process"""
+    from src.server.services.jobs import start_job_workers
+    from src.server.utils.cacheCatalog import start_cache_janitor
+    start_job_workers()
+    start_cache_janitor()
+
 app = create_app()
\ No newline at end of file
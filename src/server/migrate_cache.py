@@ -0,0 +1,8 @@
+from src.server.services.jobs import migrate_cache_keys
+
+def migrate_cache():
+    migrated = migrate_cache_keys()
+    print(f"Migrated {migrated} cache file(s) to canonical keys")
+
+if __name__ == "__main__":
+    migrate_cache()
\ No newline at end of file
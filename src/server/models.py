@@ -1,8 +1,35 @@
+from datetime import datetime
 from flask_login import UserMixin
 from src.server.extensions import db
+from src.server.utils.passwords import hash_password, verify_password, needs_rehash
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
\ No newline at end of file
+    password = db.Column(db.String(120), nullable=False)
+    # Cập nhật theo lô bởi services/history.py
+    download_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def set_password(self, password):
+        self.password = hash_password(password)
+
+    def check_password(self, password):
+        """Verify a password, upgrading its hash when the configured cost changed (caller commits)"""
+        if not verify_password(password, self.password):
+            return False
+        if needs_rehash(self.password):
+            self.password = hash_password(password)
+        return True
+
+class DownloadHistory(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    title = db.Column(db.String(255), nullable=True)
+    platform = db.Column(db.String(50), nullable=False)
+    quality = db.Column(db.String(20), nullable=False)
+    success = db.Column(db.Boolean, nullable=False, default=True)
+    downloaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('downloads', lazy=True))
\ No newline at end of file
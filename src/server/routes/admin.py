@@ -0,0 +1,33 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required
+
+from src.server.utils.admin import admin_required
+from src.server.utils.ffmpegRegistry import get_capabilities, refresh_capabilities
+from src.server.services.ydlPool import get_pool_stats
+from src.server.services.tuning import get_tuning_stats
+
+admin = Blueprint('admin', __name__)
+
+@admin.route('/api/admin/ffmpeg', methods=['GET'])
+@login_required
+@admin_required
+def ffmpeg_capabilities():
+    return jsonify(get_capabilities()), 200
+
+@admin.route('/api/admin/ffmpeg/refresh', methods=['POST'])
+@login_required
+@admin_required
+def ffmpeg_refresh():
+    return jsonify(refresh_capabilities()), 200
+
+@admin.route('/api/admin/ydl-pool', methods=['GET'])
+@login_required
+@admin_required
+def ydl_pool_stats():
+    return jsonify(get_pool_stats()), 200
+
+@admin.route('/api/admin/transfer-tuning', methods=['GET'])
+@login_required
+@admin_required
+def transfer_tuning_stats():
+    return jsonify(get_tuning_stats()), 200
\ No newline at end of file
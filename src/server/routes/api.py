@@ -1,6 +1,12 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
-from src.utils.video_utils import get_video_info, download_video
+from src.config.app import Config
+from src.config.constants import PLATFORMS
+from src.server.services.download import get_video_info
+from src.server.utils.metadataCache import get_stats as get_metadata_cache_stats
+from src.server.utils.singleFlight import get_flight_stats
+from src.server.routes.jobs import enqueue_download
+from src.server.utils.rateLimiter import RateLimitedError, take_waited
 import logging
 import re
 
@@ -34,6 +40,8 @@ def validate_url(url):
 @api.route('/api/preview', methods=['POST'])
 @login_required
 def preview_video():
+    # Thread của request trước có thể còn thời gian chờ chưa đọc
+    take_waited()
     try:
         data = request.get_json()
         if not data:
@@ -45,14 +53,26 @@ def preview_video():
         if not is_valid:
             return jsonify({'error': error_message}), 400
             
+        platform = data.get('platform') or 'auto'
+        if platform not in PLATFORMS:
+            platform = 'auto'
+            
         logger.debug(f"Processing preview request for URL: {url}")
         
-        video_info = get_video_info(url)
-        if not video_info:
+        # Qua cache metadata dùng chung: nhiều người cùng dán một link chỉ trích xuất một lần
+        try:
+            video_info = get_video_info(url, platform, Config.COOKIE_FILE)
+        except ValueError as e:
+            logger.warning(f"Preview failed for {url}: {e}")
             return jsonify({'error': 'Không thể lấy thông tin video. Vui lòng kiểm tra URL và thử lại.'}), 400
             
-        return jsonify(video_info)
+        response = jsonify(video_info)
+        response.headers['X-RateLimit-Wait'] = str(take_waited())
+        return response
         
+    except RateLimitedError:
+        # Trả 429 qua error handler của app
+        raise
     except Exception as e:
         logger.exception("Error processing preview request")
         return jsonify({'error': 'Có lỗi xảy ra khi xử lý yêu cầu'}), 500
@@ -70,16 +90,26 @@ def download_video_route():
         
         logger.debug(f"Download request - URL: {url}, Format: {format_id}")
         
-        result = download_video(url, format_id)
-        if not result['success']:
-            return jsonify({'error': result['message']}), 400
-            
-        return jsonify({
-            'message': 'Video đã được tải xuống thành công',
-            'path': result['path'],
-            'title': result['title']
-        })
+        # Đưa vào hàng đợi thay vì tải ngay trong request
+        return enqueue_download(
+            url,
+            quality=data.get('quality', 'best'),
+            format_id=format_id,
+            title=data.get('title')
+        )
         
     except Exception as e:
         logger.exception("Download error")
-        return jsonify({'error': 'Lỗi khi tải video'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Lỗi khi tải video'}), 500
+
+@api.route('/api/cache/metadata', methods=['GET'])
+@login_required
+def metadata_cache_stats():
+    """Report hit/miss counters of the shared preview metadata cache"""
+    return jsonify(get_metadata_cache_stats()), 200
+
+@api.route('/api/cache/single-flight', methods=['GET'])
+@login_required
+def single_flight_stats():
+    """Report lock wait time and coalesced requests for downloads and previews"""
+    return jsonify(get_flight_stats()), 200
\ No newline at end of file
@@ -1,5 +1,4 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from src.server.extensions import db
 from src.server.models import User
@@ -17,7 +16,9 @@ def login():
         remember = bool(request.form.get('remember'))
         
         user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password, password):
+        if user and user.check_password(password):
+            # Lưu hash mới nếu check_password vừa băm lại
+            db.session.commit()
             login_user(user, remember=remember)
             next_page = request.args.get('next')
             return redirect(next_page if next_page else url_for('main.home'))
@@ -42,9 +43,9 @@ def register():
             
         new_user = User(
             username=username,
-            email=email,
-            password=generate_password_hash(password, method='pbkdf2:sha256')
+            email=email
         )
+        new_user.set_password(password)
         
         db.session.add(new_user)
         db.session.commit()
@@ -0,0 +1,180 @@
+from flask import Blueprint, Response, jsonify, request, redirect, url_for, stream_with_context
+from flask_login import login_required, current_user
+import os
+import json
+import time
+import logging
+import threading
+
+from src.config.app import Config
+from src.server.services.jobs import submit_job, get_job, get_progress_key, JobQueueFullError, FINISHED, FAILED
+from src.server.services.progress import get_channel, wait_for_channel
+from src.server.utils.cacheCatalog import lookup_entry, get_etag
+from src.server.utils.mediaResponse import send_media
+
+logger = logging.getLogger(__name__)
+jobs = Blueprint('jobs', __name__)
+
+# Mỗi stream SSE giữ một thread request suốt lượt tải: chừa thread cho request khác
+_sse_slots = threading.BoundedSemaphore(Config.SERVER_MAX_SSE)
+
+def safe_filename(title, ext='.mp4'):
+    """Build a download filename from a video title"""
+    filename = "".join(c if c.isalnum() or c in ['-', '_', '.'] else '_' for c in (title or 'video'))
+    return f"{filename}{ext}"
+
+def job_data(job):
+    """Serialize a job for API clients"""
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'platform': job['platform'],
+        'quality': job['quality'],
+        'title': job['title'],
+        'status_url': url_for('jobs.job_status', job_id=job['id']),
+        'result_url': url_for('jobs.job_media', job_id=job['id']),
+        'events_url': url_for('jobs.job_events', job_id=job['id']),
+    }
+    if job['status'] in (FINISHED, FAILED):
+        # Thời gian chờ trong bộ giới hạn request tới nền tảng
+        data['rate_wait'] = job['rate_wait']
+    if job['status'] == FAILED:
+        data['error'] = job['error']
+    if job['status'] == FINISHED:
+        data['lock_wait'] = job['lock_wait']
+        data['coalesced'] = bool(job['coalesced'])
+    return data
+
+def job_response(job_id, status_code=200):
+    """JSON response for a job"""
+    return jsonify(job_data(get_job(job_id))), status_code
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def enqueue_download(video_url, platform='auto', quality='best', format_id=None, title=None):
+    """Queue a download for the current user and return the 202 response"""
+    try:
+        job_id = submit_job(
+            video_url,
+            platform=platform,
+            quality=quality,
+            user_id=current_user.id,
+            format_id=format_id,
+            title=title
+        )
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    logger.debug(f"Queued download job {job_id} for {video_url} ({quality})")
+    return job_response(job_id, 202)
+
+def _get_own_job(job_id):
+    job = get_job(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return None
+    return job
+
+@jobs.route('/api/jobs', methods=['POST'])
+@login_required
+def create_job():
+    data = request.get_json(silent=True) or request.form
+    video_url = (data.get('url') or '').strip()
+    if not video_url:
+        return jsonify({'error': 'URL không được để trống'}), 400
+
+    return enqueue_download(
+        video_url,
+        platform=data.get('platform', 'auto'),
+        quality=data.get('quality', 'best'),
+        format_id=data.get('format_id'),
+        title=data.get('title')
+    )
+
+@jobs.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    if not _get_own_job(job_id):
+        return jsonify({'error': 'Không tìm thấy yêu cầu tải xuống'}), 404
+    return job_response(job_id)
+
+@jobs.route('/api/jobs/<job_id>/events', methods=['GET'])
+@login_required
+def job_events(job_id):
+    """Server-Sent Events: progress (bytes, speed, ETA, phase) until the job ends"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Không tìm thấy yêu cầu tải xuống'}), 404
+    progress_key = get_progress_key(job)
+
+    if not _sse_slots.acquire(blocking=False):
+        # EventSource báo lỗi, client chuyển sang hỏi status_url định kỳ
+        logger.debug(f"Too many progress streams, {job_id} falls back to polling")
+        return jsonify(job_data(job)), 503, {'Retry-After': '1'}
+
+    def generate():
+        last_progress = None
+        last_status = None
+        last_sent = time.time()
+        status = job['status']
+        progress, statuses = get_channel(progress_key)
+        while True:
+            now = time.time()
+            # Trạng thái được đẩy lên cùng kênh tiến độ, không đọc download_jobs mỗi giây
+            status = statuses.get(job_id, status)
+            if status in (FINISHED, FAILED):
+                yield _sse('done', job_data(get_job(job_id)))
+                return
+            if status != last_status:
+                last_status = status
+                yield _sse('status', {'status': last_status})
+                last_sent = now
+
+            if progress and progress != last_progress:
+                last_progress = progress
+                yield _sse('progress', progress)
+                last_sent = now
+            elif now - last_sent >= Config.PROGRESS_KEEPALIVE:
+                yield ': keep-alive\n\n'
+                last_sent = now
+                # Phòng khi trạng thái không được đẩy (lỗi ghi): đối chiếu thưa với database
+                current = get_job(job_id)
+                if current['status'] in (FINISHED, FAILED):
+                    yield _sse('done', job_data(current))
+                    return
+
+            progress, statuses = wait_for_channel(progress_key)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Chạy cả khi client ngắt kết nối giữa chừng
+    response.call_on_close(_sse_slots.release)
+    return response
+
+@jobs.route('/api/jobs/<job_id>/result', methods=['GET'])
+@login_required
+def job_result(job_id):
+    # Đường dẫn cũ, giữ lại cho client đang dùng
+    return redirect(url_for('jobs.job_media', job_id=job_id))
+
+@jobs.route('/api/media/<job_id>', methods=['GET', 'HEAD'])
+@login_required
+def job_media(job_id):
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Không tìm thấy yêu cầu tải xuống'}), 404
+
+    if job['status'] == FAILED:
+        return jsonify({'error': job['error']}), 500
+    if job['status'] != FINISHED:
+        return job_response(job_id, 409)
+
+    entry = lookup_entry(job['file_path']) if job['file_path'] else None
+    if not entry or not os.path.exists(job['file_path']):
+        return jsonify({'error': 'File đã hết hạn, vui lòng tải lại'}), 410
+
+    ext = os.path.splitext(job['file_path'])[1] or '.mp4'
+    return send_media(job['file_path'], get_etag(entry), safe_filename(job['title'], ext))
\ No newline at end of file
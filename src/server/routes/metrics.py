@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, request, abort
+import hmac
+
+from src.config.app import Config
+from src.server.utils.metrics import render
+from src.server.utils.cacheCatalog import get_totals
+from src.server.utils.metadataCache import get_stats as get_metadata_stats
+
+metrics = Blueprint('metrics', __name__)
+
+def _scrape_gauges():
+    """Values that already live in shared state, read at scrape time"""
+    cache = get_totals()
+    metadata = get_metadata_stats()
+    return {
+        'cache_size_bytes': ('Total size of cached media files', {'{}': cache['total_size']}),
+        'cache_entries': ('Number of cached media files', {'{}': cache['entries']}),
+        'cache_evictions': ('Media files evicted from the cache so far', {'{}': cache['evictions']}),
+        'metadata_cache_lookups': ('Preview metadata cache lookups by result', {
+            '{"result":"hit"}': metadata['hits'],
+            '{"result":"miss"}': metadata['misses'],
+        }),
+    }
+
+@metrics.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of extraction, download and cache metrics"""
+    # Không có session ở đây: Prometheus gửi bearer token nếu được cấu hình
+    if Config.METRICS_TOKEN:
+        expected = f"Bearer {Config.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            abort(401)
+    return Response(render(_scrape_gauges()), mimetype='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
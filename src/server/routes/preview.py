@@ -0,0 +1,44 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import login_required
+import json
+import logging
+
+from src.config.app import Config
+from src.server.services.batch import preview_batch
+
+logger = logging.getLogger(__name__)
+preview = Blueprint('preview', __name__)
+
+def _requested_urls():
+    """Read URLs from JSON ({"urls": [...]} or a bare list) or a newline-separated form field"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('urls')
+    if isinstance(data, list):
+        return [str(url) for url in data]
+    if data is not None:
+        # JSON khác (chuỗi, số, "urls" không phải list): không có URL nào, trả 400
+        return []
+    return request.form.get('urls', '').split()
+
+@preview.route('/api/preview/batch', methods=['POST'])
+@login_required
+def preview_batch_route():
+    urls = _requested_urls()
+    if not urls:
+        return jsonify({'error': 'Danh sách URL không được để trống'}), 400
+    if len(urls) > Config.BATCH_PREVIEW_MAX_URLS:
+        return jsonify({'error': f'Tối đa {Config.BATCH_PREVIEW_MAX_URLS} URL mỗi lần'}), 400
+
+    logger.debug(f"Batch preview for {len(urls)} URL(s)")
+
+    def generate():
+        # Mỗi dòng là một kết quả JSON, gửi ngay khi có
+        for result in preview_batch(urls, Config.COOKIE_FILE):
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
\ No newline at end of file
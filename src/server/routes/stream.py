@@ -0,0 +1,81 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+import os
+import mimetypes
+import logging
+
+from src.config.app import Config
+from src.server.services.download import detect_platform
+from src.server.services.streaming import open_stream
+from src.server.routes.jobs import enqueue_download, safe_filename
+from src.server.utils.cacheCatalog import lookup_entry, register_entry, get_etag
+from src.server.utils.mediaResponse import send_media
+from src.server.services.history import record_download
+
+logger = logging.getLogger(__name__)
+stream = Blueprint('stream', __name__)
+
+@stream.route('/api/stream', methods=['GET', 'POST'])
+@login_required
+def stream_download():
+    """Send a single-file format while it downloads, or fall back to a queued job.
+
+    Only a POST (checked by CSRFProtect) may queue the fallback job; a GET
+    that needs one gets 409 and the client posts to /api/download instead.
+    """
+    video_url = request.values.get('url', '').strip()
+    if not video_url:
+        return jsonify({'error': 'URL không được để trống'}), 400
+
+    platform = request.values.get('platform', 'auto')
+    if platform == 'auto':
+        platform = detect_platform(video_url)
+    quality = request.values.get('quality', 'best')
+    format_id = request.values.get('format_id')
+    title = request.values.get('title')
+
+    try:
+        result = open_stream(video_url, platform, quality, format_id, Config.COOKIE_FILE)
+    except Exception as e:
+        logger.warning(f"Stream-through unavailable for {video_url}: {e}")
+        result = None
+
+    # Cần ghép/chuyển đổi định dạng: xử lý qua hàng đợi như bình thường
+    if result is None:
+        if request.method != 'POST':
+            # GET không được CSRF bảo vệ: trang khác không được tạo job thay người dùng
+            return jsonify({'error': 'Video này cần được tải qua hàng đợi (POST /api/download)'}), 409
+        return enqueue_download(video_url, platform, quality, format_id, title)
+
+    user_id = current_user.id
+    kind, value = result
+    if kind == 'file':
+        entry = lookup_entry(value)
+        if entry is None:
+            # File cache chưa có trong catalog: băm một lần và lưu lại, không băm mỗi request
+            register_entry(value)
+            entry = lookup_entry(value) or {'path': value}
+        ext = os.path.splitext(value)[1] or '.mp4'
+        record_download(user_id, video_url, platform, quality, title=title)
+        return send_media(value, get_etag(entry), safe_filename(title, ext))
+
+    fill = value
+    ext = os.path.splitext(fill.path)[1] or '.mp4'
+    headers = {
+        'Content-Disposition': f'attachment; filename="{safe_filename(title, ext)}"',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    }
+    if fill.size:
+        headers['Content-Length'] = str(fill.size)
+
+    response = Response(
+        stream_with_context(fill.read()),
+        mimetype=mimetypes.guess_type(fill.path)[0] or 'application/octet-stream',
+        headers=headers
+    )
+    # Kết quả chỉ biết khi stream kết thúc
+    response.call_on_close(lambda: record_download(
+        user_id, video_url, platform, quality, title=title, success=fill.done and fill.error is None
+    ))
+    return response
\ No newline at end of file
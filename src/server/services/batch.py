@@ -0,0 +1,54 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from src.config.app import Config
+from src.server.utils.validators import is_valid_url
+from src.server.services.download import detect_platform, get_video_info
+
+_executors = {}
+_executors_lock = threading.Lock()
+_pid = {'value': None}
+
+def _get_executor(platform):
+    """Return the bounded extraction pool for a platform (one set per process)"""
+    with _executors_lock:
+        if _pid['value'] != os.getpid():
+            _executors.clear()
+            _pid['value'] = os.getpid()
+
+        if platform not in _executors:
+            workers = Config.BATCH_PREVIEW_WORKERS.get(platform, 2)
+            _executors[platform] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'preview-{platform}')
+        return _executors[platform]
+
+def preview_batch(urls, cookie_file=None):
+    """Yield one preview result per URL, in completion order.
+
+    URLs are split by platform and each platform has its own bounded pool,
+    so a slow platform cannot hold up the others.
+    """
+    pending = {}
+    try:
+        for index, url in enumerate(urls):
+            url = (url or '').strip()
+            if not is_valid_url(url):
+                yield {'index': index, 'url': url, 'error': 'URL không hợp lệ'}
+                continue
+
+            platform = detect_platform(url)
+            future = _get_executor(platform).submit(get_video_info, url, platform, cookie_file)
+            pending[future] = (index, url, platform)
+
+        for future in as_completed(pending, timeout=Config.BATCH_PREVIEW_TIMEOUT):
+            index, url, platform = pending.pop(future)
+            try:
+                yield {'index': index, 'url': url, 'platform': platform, 'info': future.result()}
+            except Exception as e:
+                yield {'index': index, 'url': url, 'platform': platform, 'error': str(e)}
+    except TimeoutError:
+        for index, url, platform in pending.values():
+            yield {'index': index, 'url': url, 'platform': platform, 'error': 'Hết thời gian lấy thông tin video'}
+    finally:
+        # Client ngắt kết nối hoặc hết giờ: bỏ các URL chưa chạy
+        for future in pending:
+            future.cancel()
\ No newline at end of file
@@ -1,8 +1,17 @@
-import yt_dlp
-import os
 from src.config.constants import PLATFORMS, DEFAULT_USER_AGENT
 from src.server.utils.validators import is_ffmpeg_installed
-from src.server.utils.fileManager import get_cache_path
+from src.server.services.ydlPool import borrow_ydl
+from src.server.utils.fileManager import get_cache_path, get_postprocess_profile, download_once
+from src.server.utils.metadataCache import get_or_fetch
+from src.server.utils.formatTable import FormatTable, quality_ladder, bitrate_label
+from src.server.services.tuning import get_transfer_options
+from src.server.utils.metrics import timer
+from src.server.services.infoStore import save_info, process_info
+from src.server.services.youtube import extract_youtube_id
+from src.server.services.facebook import extract_facebook_id
+from src.server.services.tiktok import extract_tiktok_id
+from src.server.utils.cookieStore import get_cookie_file
+from src.server.utils.rateLimiter import throttle
 
 def detect_platform(url):
     """Detect which platform a URL belongs to"""
@@ -15,11 +24,27 @@ def detect_platform(url):
     # Default to youtube for unknown URLs
     return 'youtube'
 
+def get_video_id(video_url, platform):
+    """Extract the platform video ID used as the metadata cache key"""
+    if platform == 'youtube':
+        return extract_youtube_id(video_url)
+    elif platform == 'facebook':
+        return extract_facebook_id(video_url)
+    elif platform == 'tiktok':
+        return extract_tiktok_id(video_url)
+    return None
+
 def get_video_info(video_url, platform='auto', cookie_file=None):
     """Get information about a video without downloading it"""
     if platform == 'auto':
         platform = detect_platform(video_url)
     
+    video_id = get_video_id(video_url, platform)
+    result = get_or_fetch(platform, video_id, lambda: _fetch_video_info(video_url, platform, cookie_file), namespace='preview')
+    return dict(result, original_url=video_url)
+
+def _fetch_video_info(video_url, platform, cookie_file=None):
+    """Extract video information with yt-dlp"""
     # Basic options for all platforms
     ydl_opts = {
         'quiet': True,
@@ -27,12 +52,15 @@ def get_video_info(video_url, platform='auto', cookie_file=None):
         'noplaylist': True,
         'format_sort': ['res', 'ext:mp4:m4a'],
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, platform),
     }
     
+    throttle(platform)
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        with borrow_ydl(platform, ydl_opts, 'preview') as ydl:
+            with timer('extract_info_seconds', platform=platform):
+                info = ydl.extract_info(video_url, download=False)
+            save_info(platform, video_url, ydl, info)
             
             # Create embed URL based on platform
             embed_url = None
@@ -49,34 +77,21 @@ def get_video_info(video_url, platform='auto', cookie_file=None):
             elif platform == 'tiktok':
                 embed_url = video_url.replace('www.tiktok.com', 'www.tiktok.com/embed')
             
-            # Extract formats for quality options
-            formats = info.get('formats', [])
-            best_formats = {}
-            for fmt in formats:
-                height = fmt.get('height')
-                if height:
-                    if height not in best_formats:
-                        best_formats[height] = fmt
-                    else:
-                        current_bitrate = fmt.get('tbr', 0)
-                        best_bitrate = best_formats[height].get('tbr', 0)
-                        if current_bitrate > best_bitrate:
-                            best_formats[height] = fmt
+            # Bảng format gọn, dựng một lần cho mọi truy vấn bên dưới
+            table = FormatTable(info.get('formats') or [])
+            best_formats = table.best_per_height()
             
             # Generate quality options
-            qualities = []
             standard_resolutions = [2160, 1080, 720, 480, 360]
-            for height in sorted(best_formats.keys(), reverse=True):
-                if height in standard_resolutions or len(qualities) < 6:
-                    bitrate = best_formats[height].get('tbr', 0)
-                    bitrate_str = f" ({int(bitrate)}kbps)" if bitrate else ""
-                    qualities.append({
-                        'value': str(height),
-                        'label': f"{height}p{bitrate_str}"
-                    })
+            qualities = quality_ladder(
+                table,
+                best_formats,
+                lambda height, fmt, tbr: f"{height}p{bitrate_label(tbr)}",
+                keep=lambda height, count: height in standard_resolutions or count < 6
+            )
             
             # Add best quality option
-            if formats:
+            if len(table):
                 qualities.insert(0, {'value': 'best', 'label': 'Tốt nhất (cao nhất có sẵn)'})
                 
                 # Add audio-only option for YouTube
@@ -132,13 +147,10 @@ def download_video(video_url, platform='auto', quality='best', cookie_file=None)
             selected_format = 'best[ext=mp4]/best'
     
     # Set options
-    cache_path = get_cache_path(video_url, quality)
-    
     ydl_opts = {
         'format': selected_format,
-        'outtmpl': cache_path,
         'noplaylist': True,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, platform),
         'user_agent': DEFAULT_USER_AGENT,
         # Không cho phép lỗi ffmpeg dừng quá trình
         'ignoreerrors': True,
@@ -155,16 +167,30 @@ def download_video(video_url, platform='auto', quality='best', cookie_file=None)
         }]
     # Add optimizations if FFmpeg is available
     elif ffmpeg_available:
-        ydl_opts['postprocessors'] = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }]
+        # Chỉ chuyển mã khi codec không hợp với MP4, còn lại copy stream
+        ydl_opts['mp4_planner'] = True
         ydl_opts['merge_output_format'] = 'mp4'
     
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
+    ydl_opts.update(get_transfer_options(platform))
+    
+    # Cùng video, format và xử lý hậu kỳ thì dùng chung file cache
+    cache_path = get_cache_path(
+        video_url,
+        selected_format,
+        get_postprocess_profile(ydl_opts),
+        ext='.mp3' if quality == 'audio' and ffmpeg_available else '.mp4',
+        platform=platform
+    )
+    ydl_opts['outtmpl'] = cache_path
+    
+    def download():
+        with borrow_ydl(platform, ydl_opts, 'download') as ydl:
+            info = process_info(ydl, platform, video_url)
             return ydl.prepare_filename(info)
+    
+    try:
+        # Nhiều người cùng tải một video thì chỉ một worker chạy yt-dlp
+        return download_once(cache_path, download, ['.mp3'] if quality == 'audio' else None)
     except Exception as e:
         error_msg = str(e)
         if "ffmpeg is not installed" in error_msg:
@@ -1,15 +1,27 @@
-import yt_dlp
-import os
 import re
 from src.config.constants import QUALITY_MAP, DEFAULT_USER_AGENT
 from src.server.utils.validators import is_ffmpeg_installed
-from src.server.utils.fileManager import get_cache_path
+from src.server.services.ydlPool import borrow_ydl, download_error
+from src.server.utils.fileManager import get_cache_path, get_postprocess_profile, download_once
+from src.server.utils.videoIds import get_facebook_id
+from src.server.utils.metadataCache import get_or_fetch
+from src.server.utils.formatTable import FormatTable, quality_ladder, bitrate_label
+from src.server.services.tuning import get_transfer_options
+from src.server.utils.metrics import timer
+from src.server.services.infoStore import save_info, process_info
+from src.server.utils.cookieStore import get_cookie_file
+from src.server.utils.rateLimiter import throttle
 
 def get_facebook_info(video_url, cookie_file=None):
     """Get information about a Facebook video with improved error handling"""
     if not validate_facebook_url(video_url):
         raise ValueError("Invalid Facebook video URL")
 
+    result = get_or_fetch('facebook', extract_facebook_id(video_url), lambda: _fetch_facebook_info(video_url, cookie_file))
+    return dict(result, original_url=video_url)
+
+def _fetch_facebook_info(video_url, cookie_file=None):
+    """Extract Facebook video information with yt-dlp"""
     # Facebook-specific options
     ydl_opts = {
         'quiet': True,
@@ -17,12 +29,15 @@ def get_facebook_info(video_url, cookie_file=None):
         'noplaylist': True,
         'format_sort': ['res', 'ext:mp4:m4a'],
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'facebook'),
     }
     
+    throttle('facebook')
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        with borrow_ydl('facebook', ydl_opts, 'info') as ydl:
+            with timer('extract_info_seconds', platform='facebook'):
+                info = ydl.extract_info(video_url, download=False)
+            save_info('facebook', video_url, ydl, info)
             
             result = {
                 'thumbnail': info.get('thumbnail'),
@@ -35,44 +50,27 @@ def get_facebook_info(video_url, cookie_file=None):
                 'platform': 'facebook'
             }
             
-            # Extract available formats
-            formats = info.get('formats', [])
-            best_formats = {}
-            
-            # Find best format for each resolution
-            for fmt in formats:
-                height = fmt.get('height')
-                if height:
-                    if height not in best_formats:
-                        best_formats[height] = fmt
-                    else:
-                        current_bitrate = fmt.get('tbr', 0)
-                        best_bitrate = best_formats[height].get('tbr', 0)
-                        if current_bitrate > best_bitrate:
-                            best_formats[height] = fmt
+            # Bảng format gọn, dựng một lần cho mọi truy vấn bên dưới
+            table = FormatTable(info.get('formats') or [])
+            best_formats = table.best_per_height()
             
             # Generate quality options
-            qualities = []
             standard_resolutions = [1080, 720, 480, 360]
-            
-            for height in sorted(best_formats.keys(), reverse=True):
-                if height in standard_resolutions or len(qualities) < 6:
-                    bitrate = best_formats[height].get('tbr', 0)
-                    bitrate_str = f" ({int(bitrate)}kbps)" if bitrate else ""
-                    
-                    qualities.append({
-                        'value': str(height),
-                        'label': f"{height}p{bitrate_str}"
-                    })
+            qualities = quality_ladder(
+                table,
+                best_formats,
+                lambda height, fmt, tbr: f"{height}p{bitrate_label(tbr)}",
+                keep=lambda height, count: height in standard_resolutions or count < 6
+            )
             
             # Add best quality option
-            if formats:
+            if len(table):
                 qualities.insert(0, {'value': 'best', 'label': 'Tốt nhất (cao nhất có sẵn)'})
             
             result['qualities'] = qualities
             return result
             
-    except yt_dlp.utils.DownloadError as e:
+    except download_error() as e:
         error_msg = str(e)
         if "Video unavailable" in error_msg:
             raise ValueError("Video Facebook này là riêng tư hoặc không khả dụng")
@@ -83,22 +81,31 @@ def get_facebook_info(video_url, cookie_file=None):
     except Exception as e:
         raise ValueError(f"Lỗi xảy ra: {str(e)}")
 
+def prepare_facebook_download(video_url, quality='best', cookie_file=None):
+    """Build yt-dlp options and the cache path for a Facebook download"""
+    # Get download options
+    ydl_opts = get_facebook_download_options(quality, cookie_file)
+    
+    # Set output path
+    cache_path = get_cache_path(video_url, ydl_opts['format'], get_postprocess_profile(ydl_opts), platform='facebook')
+    ydl_opts['outtmpl'] = cache_path
+    return ydl_opts, cache_path
+
 def download_facebook_video(video_url, quality='best', cookie_file=None):
     """Download a Facebook video with specified quality"""
     if not validate_facebook_url(video_url):
         raise ValueError("Invalid Facebook URL")
         
-    # Get download options
-    ydl_opts = get_facebook_download_options(quality, cookie_file)
+    ydl_opts, cache_path = prepare_facebook_download(video_url, quality, cookie_file)
     
-    # Set output path
-    cache_path = get_cache_path(video_url, quality)
-    ydl_opts['outtmpl'] = cache_path
+    def download():
+        with borrow_ydl('facebook', ydl_opts, 'download') as ydl:
+            info = process_info(ydl, 'facebook', video_url)
+            return ydl.prepare_filename(info)
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
-            return ydl.prepare_filename(info)
+        # Nhiều người cùng tải một video thì chỉ một worker chạy yt-dlp
+        return download_once(cache_path, download)
     except Exception as e:
         raise ValueError(f"Không thể tải video: {str(e)}")
 
@@ -123,21 +130,26 @@ def get_facebook_download_options(quality, cookie_file=None):
         'format': selected_format,
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'facebook'),
         'retries': 5,  # More retries for Facebook
         'fragment_retries': 10,
     }
     
     # Add optimizations if FFmpeg is available
     if ffmpeg_available:
-        opts['postprocessors'] = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }]
+        # Chỉ chuyển mã khi codec không hợp với MP4, còn lại copy stream
+        opts['mp4_planner'] = True
         opts['merge_output_format'] = 'mp4'
     
+    # Tải nhiều fragment HLS song song, mức song song do bộ tự điều chỉnh học được
+    opts.update(get_transfer_options('facebook'))
     return opts
 
+def extract_facebook_id(url):
+    """Extract the Facebook video ID from a URL"""
+    # m./web./www. và fb.watch đều quy về cùng một ID
+    return get_facebook_id(url)
+
 def validate_facebook_url(url):
     """Improved validation for Facebook video URLs"""
     if not url:
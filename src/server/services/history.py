@@ -0,0 +1,140 @@
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from collections import Counter
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Cùng bảng với models.DownloadHistory, để ghi được trước khi init_db chạy
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS download_history (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES user (id),
+    url VARCHAR(500) NOT NULL,
+    title VARCHAR(255),
+    platform VARCHAR(50) NOT NULL,
+    quality VARCHAR(20) NOT NULL,
+    success BOOLEAN NOT NULL,
+    downloaded_at DATETIME
+);
+"""
+
+# Dòng chờ ghi của tiến trình này: (user_id, url, title, platform, quality, success, downloaded_at)
+_buffer = []
+_lock = threading.Lock()
+_wake = threading.Event()
+_state = {'pid': None, 'schema_pid': None}
+
+def _conn():
+    conn = get_connection(Config.DB_PATH, schema=SCHEMA)
+    if _state['schema_pid'] != os.getpid():
+        migrate_schema()
+    return conn
+
+def migrate_schema():
+    """Add the download_count column to a user table created before it existed.
+
+    Called from create_app so that User queries never run against the old table.
+    """
+    conn = get_connection(Config.DB_PATH, schema=SCHEMA)
+    columns = [row['name'] for row in conn.execute('PRAGMA table_info("user")')]
+    if columns and 'download_count' not in columns:
+        try:
+            conn.execute('ALTER TABLE "user" ADD COLUMN download_count INTEGER NOT NULL DEFAULT 0')
+        except sqlite3.OperationalError:
+            # Worker khác vừa thêm cột
+            pass
+    _state['schema_pid'] = os.getpid()
+
+def _ensure_writer():
+    if _state['pid'] == os.getpid():
+        return
+    with _lock:
+        if _state['pid'] == os.getpid():
+            return
+        # Dòng chưa ghi của tiến trình cha do tiến trình cha ghi
+        del _buffer[:]
+        _state['pid'] = os.getpid()
+    threading.Thread(target=_flush_loop, name='history-flush', daemon=True).start()
+
+def record_download(user_id, url, platform, quality, title=None, success=True):
+    """Queue a history row (and a download count increment on success) for the next group commit"""
+    _ensure_writer()
+    row = (
+        user_id, url, title, platform, quality, int(bool(success)),
+        datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    )
+    with _lock:
+        _buffer.append(row)
+        full = len(_buffer) >= Config.HISTORY_FLUSH_ROWS
+    if full:
+        _wake.set()
+
+def record_job(job):
+    """Job listener: queue the history row of a finished or failed background job"""
+    from src.server.services.jobs import FINISHED
+    if job['user_id'] is None:
+        return
+    record_download(
+        job['user_id'],
+        job['url'],
+        job['platform'],
+        job['quality'],
+        title=job['title'],
+        success=job['status'] == FINISHED
+    )
+
+def flush():
+    """Write buffered history rows and download counts in one transaction, return the row count"""
+    with _lock:
+        rows = _buffer[:]
+        del _buffer[:]
+    if not rows:
+        return 0
+
+    counts = Counter(row[0] for row in rows if row[5])
+    conn = _conn()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(
+            'INSERT INTO download_history (user_id, url, title, platform, quality, success, downloaded_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        conn.executemany(
+            'UPDATE "user" SET download_count = download_count + ? WHERE id = ?',
+            [(count, user_id) for user_id, count in counts.items()]
+        )
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        # Giữ lại để ghi ở lần sau, trước các dòng mới hơn
+        with _lock:
+            _buffer[:0] = rows
+        raise
+    return len(rows)
+
+def _flush_loop():
+    while True:
+        _wake.wait(Config.HISTORY_FLUSH_INTERVAL / 1000)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Cannot write download history")
+
+@atexit.register
+def _flush_at_exit():
+    # Dừng server (kể cả worker gunicorn) không làm mất các dòng còn trong bộ đệm
+    if _state['pid'] != os.getpid():
+        return
+    try:
+        flush()
+    except Exception:
+        logger.exception("Cannot write download history on shutdown")
\ No newline at end of file
@@ -0,0 +1,139 @@
+import re
+import json
+import time
+import zlib
+import logging
+from urllib.parse import urlsplit, parse_qsl
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.videoIds import canonical_video_ref
+from src.server.utils.metrics import timer, inc
+from src.server.services.ydlPool import download_error
+from src.server.utils.rateLimiter import throttle
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extracted_info (
+    token TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extracted_info_expires ON extracted_info (expires_at);
+"""
+
+# Tham số hết hạn trong URL của từng CDN (giá trị thập phân hoặc hex)
+_EXPIRY_PARAMS = {'expire': 10, 'expires': 10, 'x-expires': 10, 'oe': 16}
+
+# URL định dạng hết hạn / bị thu hồi
+_STALE_URL_STATUSES = (403, 404, 410)
+
+# Phần lớn và không cần cho việc tải
+_DROPPED_KEYS = ('automatic_captions', 'heatmap')
+
+def _conn():
+    return get_connection(schema=SCHEMA)
+
+def info_token(platform, video_url):
+    """Token the extracted info of a video is kept under"""
+    platform, video_id = canonical_video_ref(video_url, platform)
+    return f"{platform}:{video_id}"
+
+def _url_expiry(url):
+    for key, value in parse_qsl(urlsplit(url).query):
+        base = _EXPIRY_PARAMS.get(key.lower())
+        if base:
+            try:
+                return int(value, base)
+            except ValueError:
+                pass
+    return None
+
+def get_expiry(info):
+    """Earliest expiry of the format URLs in an info dict, or None if they carry none"""
+    expiries = [
+        _url_expiry(fmt['url'])
+        for fmt in info.get('formats') or [info]
+        if fmt.get('url')
+    ]
+    expiries = [expiry for expiry in expiries if expiry]
+    return min(expiries) if expiries else None
+
+def save_info(platform, video_url, ydl, info):
+    """Keep the info dict of a preview so the download can skip extraction"""
+    now = time.time()
+    expires_at = get_expiry(info) or now + Config.EXTRACTED_INFO_TTL
+    # Chừa thời gian cho lượt tải chờ trong hàng đợi
+    expires_at = min(expires_at, now + Config.EXTRACTED_INFO_TTL) - Config.EXTRACTED_INFO_MARGIN
+    if expires_at <= now:
+        return
+
+    try:
+        # Giống --load-info-json của yt-dlp: bỏ các khoá riêng của lượt trích xuất trước
+        data = ydl.sanitize_info(info, remove_private_keys=True)
+        for key in _DROPPED_KEYS:
+            data.pop(key, None)
+        blob = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 1)
+        conn = _conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO extracted_info (token, data, expires_at, created_at) VALUES (?, ?, ?, ?)',
+            (info_token(platform, video_url), blob, expires_at, now)
+        )
+        conn.execute('DELETE FROM extracted_info WHERE expires_at < ?', (now,))
+    except Exception:
+        logger.exception(f"Cannot save extracted info for {video_url}")
+
+def load_info(platform, video_url):
+    """Return the saved info dict of a video while its format URLs are valid"""
+    row = _conn().execute(
+        'SELECT data FROM extracted_info WHERE token = ? AND expires_at > ?',
+        (info_token(platform, video_url), time.time())
+    ).fetchone()
+    if not row:
+        return None
+    return json.loads(zlib.decompress(row['data']))
+
+def discard_info(platform, video_url):
+    """Forget the saved info of a video (its URLs stopped working)"""
+    _conn().execute('DELETE FROM extracted_info WHERE token = ?', (info_token(platform, video_url),))
+
+def is_stale_url_error(error):
+    """Whether a yt-dlp DownloadError comes from a format URL answering HTTP 403/404/410"""
+    cause = (getattr(error, 'exc_info', None) or (None, None))[1]
+    code = getattr(cause, 'code', None) or getattr(getattr(cause, 'response', None), 'status', None)
+    if code is None:
+        match = re.search(r'HTTP Error (\d{3})', str(error))
+        code = int(match.group(1)) if match else None
+    return code in _STALE_URL_STATUSES
+
+def process_info(ydl, platform, video_url, download=True):
+    """Run yt-dlp on the preview's saved info, extracting again only when there is none.
+
+    Format selection, downloading and post-processing go through
+    process_ie_result, so the webpage/player requests and signature solving of
+    a second extract_info are skipped.
+    """
+    # Dùng info đã lưu vẫn gửi request tới nền tảng (manifest, media)
+    throttle(platform)
+    info = load_info(platform, video_url)
+    if info is not None:
+        try:
+            result = ydl.process_ie_result(info, download=download)
+            inc('extracted_info_reuse_total', platform=platform, result='reused')
+            return result
+        except download_error() as e:
+            # Lỗi khác (hết dung lượng, FFmpeg, job bị huỷ) không phải do URL cũ: tải lại cũng vô ích
+            if not is_stale_url_error(e):
+                raise
+            # URL hết hạn sớm hoặc bị chặn: trích xuất lại như bình thường
+            logger.warning(f"Saved info for {video_url} unusable, extracting again: {e}")
+            discard_info(platform, video_url)
+            inc('extracted_info_reuse_total', platform=platform, result='stale')
+    else:
+        inc('extracted_info_reuse_total', platform=platform, result='missing')
+
+    if download:
+        return ydl.extract_info(video_url, download=True)
+    with timer('extract_info_seconds', platform=platform):
+        return ydl.extract_info(video_url, download=False)
\ No newline at end of file
@@ -0,0 +1,332 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.singleFlight import get_owner, last_flight
+from src.server.services.progress import track_progress, publish_status
+from src.server.services.tuning import record_transfer
+from src.server.utils.metrics import observe, inc, in_flight
+from src.server.utils.rateLimiter import take_waited
+from src.server.services.download import detect_platform
+from src.server.utils.fileManager import get_legacy_cache_names, migrate_cache_file
+from src.server.services.youtube import download_youtube_video, prepare_youtube_download
+from src.server.services.facebook import download_facebook_video, prepare_facebook_download
+from src.server.services.tiktok import download_tiktok_video, prepare_tiktok_download
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS download_jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    url TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    format_id TEXT,
+    title TEXT,
+    status TEXT NOT NULL,
+    file_path TEXT,
+    error TEXT,
+    lock_wait REAL,
+    coalesced INTEGER,
+    rate_wait REAL,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_download_jobs_status ON download_jobs (status, heartbeat_at);
+"""
+
+# Trạng thái của job
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many download jobs are waiting"""
+
+_state = {'pid': None, 'executor': None, 'maintenance': None}
+_state_lock = threading.Lock()
+_listeners = []
+_migrated = {'pid': None}
+
+def _conn():
+    conn = get_connection(Config.DB_PATH, schema=SCHEMA)
+    if _migrated['pid'] != os.getpid():
+        # Bảng cũ chưa có cột rate_wait
+        try:
+            conn.execute('ALTER TABLE download_jobs ADD COLUMN rate_wait REAL')
+        except sqlite3.OperationalError:
+            pass
+        _migrated['pid'] = os.getpid()
+    return conn
+
+def _executor():
+    """Get the worker pool of this process, recreated after a fork"""
+    with _state_lock:
+        if _state['pid'] != os.getpid():
+            _state['pid'] = os.getpid()
+            _state['executor'] = ThreadPoolExecutor(
+                max_workers=Config.DOWNLOAD_WORKERS,
+                thread_name_prefix='download-job'
+            )
+            _state['maintenance'] = threading.Thread(
+                target=_maintenance_loop, name='download-job-maintenance', daemon=True
+            )
+            _state['maintenance'].start()
+        return _state['executor']
+
+def register_job_listener(listener):
+    """Register a callback called with the job dict when a job finishes or fails"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+def submit_job(video_url, platform='auto', quality='best', user_id=None, format_id=None, title=None):
+    """Queue a download job and return its ID immediately"""
+    if not platform or platform == 'auto':
+        platform = detect_platform(video_url)
+
+    conn = _conn()
+    queued = conn.execute(
+        'SELECT COUNT(*) FROM download_jobs WHERE status = ?', (QUEUED,)
+    ).fetchone()[0]
+    if queued >= Config.MAX_QUEUED_JOBS:
+        raise JobQueueFullError("Hàng đợi tải xuống đang đầy, vui lòng thử lại sau")
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn.execute(
+        'INSERT INTO download_jobs (id, user_id, url, platform, quality, format_id, title, status, worker, created_at, heartbeat_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (job_id, user_id, video_url, platform, quality, format_id, title, QUEUED, get_owner(), now, now)
+    )
+    _executor().submit(run_job, job_id)
+    return job_id
+
+def get_job(job_id):
+    """Return a job as a dict, or None if it does not exist"""
+    row = _conn().execute('SELECT * FROM download_jobs WHERE id = ?', (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def _download(job):
+    """Run the platform download service for a job"""
+    platform = job['platform']
+    cookie_file = Config.COOKIE_FILE
+
+    if platform == 'facebook':
+        return download_facebook_video(job['url'], job['quality'], cookie_file)
+    elif platform == 'tiktok':
+        return download_tiktok_video(job['url'], job['quality'], cookie_file)
+    else:
+        return download_youtube_video(job['url'], job['quality'], cookie_file, job['format_id'])
+
+def _record_transfer(job, progress, failed):
+    """Let the transfer tuner learn from this job's fragment throughput and errors"""
+    if not progress.fragments and not progress.fragment_count:
+        # Tải HTTP thường (kể cả chia chunk): không có fragment, concurrency không ảnh hưởng
+        logger.debug(f"Job {job['id']} was not fragmented, not used for transfer tuning")
+        return
+    try:
+        record_transfer(
+            job['platform'],
+            progress.done_bytes,
+            progress.transfer_seconds,
+            progress.fragments + progress.fragment_count,
+            progress.errors,
+            failed=failed
+        )
+    except Exception:
+        logger.exception(f"Cannot record transfer stats for job {job['id']}")
+
+def run_job(job_id):
+    """Claim a queued job and run it in the current worker thread"""
+    conn = _conn()
+    now = time.time()
+    claimed = conn.execute(
+        'UPDATE download_jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? '
+        'WHERE id = ? AND status = ?',
+        (RUNNING, get_owner(), now, now, job_id, QUEUED)
+    ).rowcount
+    if not claimed:
+        return
+
+    job = get_job(job_id)
+    platform = job['platform']
+    started = time.perf_counter()
+    take_waited()
+    progress_key = get_progress_key(job)
+    publish_status(progress_key, job_id, RUNNING)
+    try:
+        with track_progress(progress_key) as progress, in_flight('downloads_in_flight', platform=platform):
+            try:
+                file_path = _download(job)
+            except Exception:
+                _record_transfer(job, progress, failed=True)
+                raise
+            _record_transfer(job, progress, failed=False)
+        _observe_download(platform, file_path, progress, time.perf_counter() - started)
+        # Thời gian chờ worker khác và việc dùng lại kết quả của họ
+        flight = last_flight()
+        conn.execute(
+            'UPDATE download_jobs SET status = ?, file_path = ?, finished_at = ?, lock_wait = ?, coalesced = ?, rate_wait = ? '
+            'WHERE id = ?',
+            (FINISHED, file_path, time.time(), flight['wait_seconds'], int(flight['coalesced']), take_waited(), job_id)
+        )
+        publish_status(progress_key, job_id, FINISHED)
+    except Exception as e:
+        logger.error(f"Download job {job_id} failed: {e}")
+        inc('downloads_total', platform=platform, outcome='failed')
+        conn.execute(
+            'UPDATE download_jobs SET status = ?, error = ?, finished_at = ?, rate_wait = ? WHERE id = ?',
+            (FAILED, str(e) or 'Download failed', time.time(), take_waited(), job_id)
+        )
+        publish_status(progress_key, job_id, FAILED)
+
+    job = get_job(job_id)
+    for listener in _listeners:
+        try:
+            listener(job)
+        except Exception:
+            logger.exception(f"Job listener failed for {job_id}")
+
+def _observe_download(platform, file_path, progress, seconds):
+    """Record duration and size of a finished download"""
+    # Lấy từ cache hoặc từ worker khác thì không phải một lượt tải thật
+    outcome = 'downloaded' if progress.done_bytes else 'cached'
+    inc('downloads_total', platform=platform, outcome=outcome)
+    observe('download_seconds', seconds, platform=platform, outcome=outcome)
+    if outcome == 'downloaded' and file_path and os.path.isfile(file_path):
+        observe('download_bytes', os.path.getsize(file_path), platform=platform)
+
+def resolve_cache_path(job):
+    """Compute the canonical cache path a job downloads into"""
+    platform = job['platform']
+    if platform == 'facebook':
+        return prepare_facebook_download(job['url'], job['quality'])[1]
+    elif platform == 'tiktok':
+        return prepare_tiktok_download(job['url'], job['quality'])[1]
+    else:
+        return prepare_youtube_download(job['url'], job['quality'], None, job['format_id'])[1]
+
+def get_progress_key(job):
+    """Progress channel of a job, shared by every job downloading the same cache file"""
+    return os.path.basename(resolve_cache_path(job))
+
+def _history_downloads():
+    """(url, platform, quality) of downloads recorded in download_history tables.
+    
+    The old app logged every download there (column video_url or url), long
+    before download_jobs existed, so this is where legacy cache files are known.
+    """
+    downloads = set()
+    for db_path in (Config.LEGACY_DB_PATH, Config.DB_PATH):
+        if not os.path.isfile(db_path):
+            continue
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(download_history)')}
+            url_column = 'video_url' if 'video_url' in columns else 'url'
+            if url_column not in columns:
+                continue
+            for url, platform, quality in conn.execute(
+                f'SELECT DISTINCT {url_column}, platform, quality FROM download_history'
+            ):
+                downloads.add((url, platform, quality))
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot read download history from {db_path}: {e}")
+        finally:
+            conn.close()
+    return downloads
+
+def migrate_cache_keys():
+    """Re-key cache files named after md5(url + quality) to canonical cache keys.
+    
+    The old names cannot be reversed, so the URL and quality of every recorded
+    download (download history of the old app, then finished jobs) are used to
+    find them. Returns the number of migrated files.
+    """
+    conn = _conn()
+    rows = [
+        {'url': url, 'platform': platform, 'quality': quality, 'format_id': None}
+        for url, platform, quality in _history_downloads()
+    ]
+    rows += [dict(row) for row in conn.execute(
+        'SELECT DISTINCT url, platform, quality, format_id FROM download_jobs WHERE status = ?', (FINISHED,)
+    )]
+    
+    migrated = 0
+    for job in rows:
+        if job['platform'] not in ('youtube', 'facebook', 'tiktok'):
+            job['platform'] = detect_platform(job['url'])
+        try:
+            new_path = resolve_cache_path(job)
+        except Exception as e:
+            logger.warning(f"Cannot resolve cache key for {job['url']}: {e}")
+            continue
+            
+        for legacy_name in get_legacy_cache_names(job['url'], job['quality'], job['format_id']):
+            target = migrate_cache_file(legacy_name, new_path)
+            if target:
+                conn.execute(
+                    'UPDATE download_jobs SET file_path = ? WHERE url = ? AND quality = ? AND status = ?',
+                    (target, job['url'], job['quality'], FINISHED)
+                )
+                migrated += 1
+    
+    logger.info(f"Migrated {migrated} cache file(s) to canonical keys")
+    return migrated
+
+def recover_jobs():
+    """Take over queued/running jobs whose worker stopped sending heartbeats"""
+    conn = _conn()
+    now = time.time()
+    stale_before = now - Config.JOB_STALE_AFTER
+    rows = conn.execute(
+        'SELECT id FROM download_jobs WHERE status IN (?, ?) AND heartbeat_at < ?',
+        (QUEUED, RUNNING, stale_before)
+    ).fetchall()
+
+    recovered = 0
+    for row in rows:
+        # Chỉ một tiến trình giành được job nhờ điều kiện heartbeat_at
+        claimed = conn.execute(
+            'UPDATE download_jobs SET status = ?, worker = ?, heartbeat_at = ? '
+            'WHERE id = ? AND status IN (?, ?) AND heartbeat_at < ?',
+            (QUEUED, get_owner(), now, row['id'], QUEUED, RUNNING, stale_before)
+        ).rowcount
+        if claimed:
+            try:
+                publish_status(get_progress_key(get_job(row['id'])), row['id'], QUEUED)
+            except Exception:
+                logger.exception(f"Cannot publish status of recovered job {row['id']}")
+            _executor().submit(run_job, row['id'])
+            recovered += 1
+
+    if recovered:
+        logger.info(f"Recovered {recovered} download job(s)")
+    return recovered
+
+def _maintenance_loop():
+    """Send heartbeats for this process's jobs and recover orphaned ones"""
+    while True:
+        try:
+            _conn().execute(
+                'UPDATE download_jobs SET heartbeat_at = ? WHERE worker = ? AND status IN (?, ?)',
+                (time.time(), get_owner(), QUEUED, RUNNING)
+            )
+            recover_jobs()
+        except Exception:
+            logger.exception("Download job maintenance failed")
+        time.sleep(Config.JOB_HEARTBEAT_INTERVAL)
+
+def start_job_workers():
+    """Start the worker pool and resume jobs left over by a previous process"""
+    _executor()
@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+from src.server.utils.ffmpegRegistry import get_capabilities
+
+logger = logging.getLogger(__name__)
+
+# Codec có thể copy thẳng vào MP4 mà trình phát phổ biến vẫn đọc được
+MP4_VIDEO_CODECS = ('avc1', 'avc3', 'h264', 'hev1', 'hvc1', 'h265', 'av01')
+MP4_AUDIO_CODECS = ('mp4a', 'aac', 'mp3', 'ac-3', 'ec-3')
+
+def _codec_ok(codec, allowed):
+    codec = (codec or 'none').lower()
+    return codec == 'none' or codec.startswith(allowed)
+
+def _stream_codecs(info):
+    """Return (vcodec, acodec) of the selected formats in an info dict"""
+    vcodec = info.get('vcodec')
+    acodec = info.get('acodec')
+    for fmt in info.get('requested_formats') or []:
+        if fmt.get('vcodec') not in (None, 'none'):
+            vcodec = fmt['vcodec']
+        if fmt.get('acodec') not in (None, 'none'):
+            acodec = fmt['acodec']
+    return vcodec, acodec
+
+def plan_mp4(info):
+    """Decide how to turn the downloaded file into MP4.
+
+    Returns (action, ffmpeg_args) where action is 'skip' (already MP4 with
+    compatible codecs), 'remux' (stream copy into MP4) or 'transcode' (only
+    the incompatible streams are re-encoded).
+    """
+    vcodec, acodec = _stream_codecs(info)
+    video_ok = _codec_ok(vcodec, MP4_VIDEO_CODECS)
+    audio_ok = _codec_ok(acodec, MP4_AUDIO_CODECS)
+
+    if video_ok and audio_ok:
+        if info.get('ext') == 'mp4':
+            return 'skip', []
+        return 'remux', ['-map', '0', '-c', 'copy', '-movflags', '+faststart']
+
+    args = ['-map', '0']
+    args += ['-c:v', 'copy'] if video_ok else ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23']
+    args += ['-c:a', 'copy'] if audio_ok else ['-c:a', 'aac', '-b:a', '192k']
+    args += ['-movflags', '+faststart']
+    return 'transcode', args
+
+_planner_class = {}
+
+def get_planner_class():
+    """Mp4PlannerPP, defined on first use so importing this module does not load yt-dlp"""
+    if 'value' in _planner_class:
+        return _planner_class['value']
+    
+    from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+    from yt_dlp.utils import prepend_extension, replace_extension
+    
+    class Mp4PlannerPP(FFmpegPostProcessor):
+        """Post-processor that stream-copies into MP4 and transcodes only when needed"""
+
+        def run(self, info):
+            path = info['filepath']
+            started = time.time()
+            action, args = plan_mp4(info)
+            vcodec, acodec = _stream_codecs(info)
+
+            if action == 'skip':
+                logger.info(f"MP4 plan for {os.path.basename(path)}: skip ({vcodec}/{acodec})")
+                return [], info
+
+            target = replace_extension(path, 'mp4')
+            temp_path = prepend_extension(target, 'temp')
+            self.run_ffmpeg(path, temp_path, args)
+            os.replace(temp_path, target)
+
+            logger.info(
+                f"MP4 plan for {os.path.basename(path)}: {action} ({vcodec}/{acodec}) "
+                f"in {time.time() - started:.2f}s"
+            )
+
+            files_to_delete = [path] if target != path else []
+            info['filepath'] = target
+            info['ext'] = 'mp4'
+            return files_to_delete, info
+    
+    _planner_class['value'] = Mp4PlannerPP
+    return Mp4PlannerPP
+
+def build_downloader(ydl_opts):
+    """Create a YoutubeDL with the MP4 planner attached when the options ask for it"""
+    ffmpeg_location = get_capabilities()['ffmpeg_location']
+    if ffmpeg_location and not ydl_opts.get('ffmpeg_location'):
+        ydl_opts = dict(ydl_opts, ffmpeg_location=ffmpeg_location)
+    
+    import yt_dlp
+    ydl = yt_dlp.YoutubeDL(ydl_opts)
+    if ydl_opts.get('mp4_planner'):
+        ydl.add_post_processor(get_planner_class()(ydl), when='post_process')
+    return ydl
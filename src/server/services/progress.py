@@ -0,0 +1,269 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS download_progress (
+    key TEXT PRIMARY KEY,
+    phase TEXT NOT NULL,
+    downloaded_bytes INTEGER,
+    total_bytes INTEGER,
+    speed REAL,
+    eta REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_status (
+    job_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_status_key ON job_status (key);
+CREATE INDEX IF NOT EXISTS idx_job_status_updated ON job_status (updated_at);
+"""
+
+# Trạng thái job đã kết thúc được giữ lại cho người xem đến muộn
+JOB_STATUS_TTL = 60 * 60
+
+# Giai đoạn xử lý của một lượt tải
+DOWNLOAD = 'download'
+MERGE = 'merge'
+CONVERT = 'convert'
+
+# Post-processor chỉ di chuyển/sửa file, không tính là một giai đoạn
+_IGNORED_POSTPROCESSORS = ('MoveFiles', 'MoveFilesAfterDownload')
+
+# Thread đang chạy job nào (để gắn hook khi mượn YoutubeDL)
+_current = threading.local()
+
+# Báo cho người xem trong tiến trình này khi kênh của họ có cập nhật:
+# key -> [Condition, số người đang chờ]
+_lock = threading.Lock()
+_channels = {}
+_snapshots = {}
+
+def _conn():
+    return get_connection(schema=SCHEMA)
+
+def _interval():
+    return 1.0 / Config.PROGRESS_UPDATES_PER_SECOND
+
+class ProgressReporter:
+    """Collects yt-dlp hook events for one download and publishes them, throttled"""
+
+    def __init__(self, key):
+        self.key = key
+        self.phase = DOWNLOAD
+        self.done_bytes = 0
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.speed = None
+        self.eta = None
+        self.published_at = 0.0
+        self.lock = threading.Lock()
+        # Số liệu cho bộ tự điều chỉnh tốc độ tải
+        self.fragments = 0
+        self.fragment_count = 0
+        self.errors = 0
+        self.transfer_seconds = 0.0
+        self.postprocess_started = {}
+
+    def on_progress(self, d):
+        with self.lock:
+            if d['status'] == 'downloading':
+                self.phase = DOWNLOAD
+                self.fragment_count = d.get('fragment_count') or 0
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                self.downloaded_bytes = self.done_bytes + (d.get('downloaded_bytes') or 0)
+                self.total_bytes = self.done_bytes + total if total else None
+                self.speed = d.get('speed')
+                self.eta = d.get('eta')
+                force = False
+            elif d['status'] == 'finished':
+                # Video và audio tải riêng: cộng dồn số byte đã xong
+                self.done_bytes += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+                self.downloaded_bytes = self.total_bytes = self.done_bytes
+                self.fragments += self.fragment_count
+                self.fragment_count = 0
+                self.transfer_seconds += d.get('elapsed') or 0.0
+                self.speed = self.eta = None
+                force = True
+            else:
+                return
+        self.publish(force)
+
+    def on_warning(self, message):
+        # yt-dlp báo lỗi fragment bằng cảnh báo trước khi thử lại
+        if 'fragment' in message.lower() or 'retrying' in message.lower():
+            with self.lock:
+                self.errors += 1
+
+    def on_postprocess(self, d):
+        name = d.get('postprocessor')
+        if name in _IGNORED_POSTPROCESSORS:
+            return
+        if d['status'] == 'finished':
+            started = self.postprocess_started.pop(name, None)
+            if started is not None:
+                observe('postprocess_seconds', time.perf_counter() - started, postprocessor=name)
+            return
+        if d['status'] != 'started':
+            return
+        self.postprocess_started[name] = time.perf_counter()
+        with self.lock:
+            self.phase = MERGE if name == 'Merger' else CONVERT
+            self.speed = self.eta = None
+        self.publish(force=True)
+
+    def publish(self, force=False):
+        """Write the current state, at most PROGRESS_UPDATES_PER_SECOND times a second"""
+        now = time.time()
+        with self.lock:
+            if not force and now - self.published_at < _interval():
+                return
+            self.published_at = now
+            row = (self.key, self.phase, self.downloaded_bytes, self.total_bytes, self.speed, self.eta, now)
+        try:
+            _conn().execute(
+                'INSERT OR REPLACE INTO download_progress '
+                '(key, phase, downloaded_bytes, total_bytes, speed, eta, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                row
+            )
+        except Exception:
+            logger.exception(f"Cannot publish progress for {self.key}")
+        _notify(self.key)
+
+class ProgressRelay:
+    """Hooks (and logger) attached once to a pooled YoutubeDL, forwarding to whoever borrowed it"""
+
+    def __init__(self):
+        self.reporter = None
+
+    def debug(self, message):
+        logger.debug(message)
+
+    def info(self, message):
+        logger.info(message)
+
+    def warning(self, message):
+        reporter = self.reporter
+        if reporter:
+            reporter.on_warning(message)
+        logger.warning(message)
+
+    def error(self, message):
+        reporter = self.reporter
+        if reporter:
+            reporter.on_warning(message)
+        logger.error(message)
+
+    def on_progress(self, d):
+        reporter = self.reporter
+        if reporter:
+            reporter.on_progress(d)
+
+    def on_postprocess(self, d):
+        reporter = self.reporter
+        if reporter:
+            reporter.on_postprocess(d)
+
+def attach_relay(ydl):
+    """Install progress and post-processor hooks on a YoutubeDL instance"""
+    relay = ProgressRelay()
+    ydl.add_progress_hook(relay.on_progress)
+    ydl.add_postprocessor_hook(relay.on_postprocess)
+    # Logger được đọc lại mỗi lần yt-dlp ghi log nên gắn sau khi tạo được
+    ydl.params['logger'] = relay
+    return relay
+
+@contextmanager
+def track_progress(key):
+    """Report progress of yt-dlp calls made by this thread under key"""
+    _current.reporter = ProgressReporter(key)
+    try:
+        yield _current.reporter
+    finally:
+        _current.reporter = None
+        try:
+            _conn().execute('DELETE FROM download_progress WHERE key = ?', (key,))
+        except Exception:
+            logger.exception(f"Cannot clear progress for {key}")
+        _notify(key)
+
+def current_reporter():
+    """Return the progress reporter of the current thread, if any"""
+    return getattr(_current, 'reporter', None)
+
+def _notify(key):
+    with _lock:
+        _snapshots.pop(key, None)
+        channel = _channels.get(key)
+        if channel:
+            channel[0].notify_all()
+
+def publish_status(key, job_id, status):
+    """Announce a job's status on its progress channel (watchers stop polling download_jobs)"""
+    now = time.time()
+    try:
+        conn = _conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO job_status (job_id, key, status, updated_at) VALUES (?, ?, ?, ?)',
+            (job_id, key, status, now)
+        )
+        conn.execute('DELETE FROM job_status WHERE updated_at < ?', (now - JOB_STATUS_TTL,))
+    except Exception:
+        logger.exception(f"Cannot publish status of job {job_id}")
+    _notify(key)
+
+def get_channel(key):
+    """Latest progress and job statuses of a channel, read from the database at most once per interval.
+
+    Every watcher of the same key in this process shares one read.
+    """
+    now = time.time()
+    with _lock:
+        cached = _snapshots.get(key)
+        if cached and now - cached[0] < _interval():
+            return cached[1]
+
+    conn = _conn()
+    row = conn.execute('SELECT * FROM download_progress WHERE key = ?', (key,)).fetchone()
+    progress = dict(row) if row else None
+    if progress:
+        progress.pop('key')
+    statuses = {
+        row['job_id']: row['status']
+        for row in conn.execute('SELECT job_id, status FROM job_status WHERE key = ?', (key,))
+    }
+    with _lock:
+        _snapshots[key] = (now, (progress, statuses))
+    return progress, statuses
+
+def get_progress(key):
+    """Return the latest progress for key"""
+    return get_channel(key)[0]
+
+def wait_for_channel(key, timeout=None):
+    """Wait for a local update of key (or one interval for other processes), then return get_channel(key)"""
+    with _lock:
+        channel = _channels.get(key)
+        if channel is None:
+            channel = _channels[key] = [threading.Condition(_lock), 0]
+        channel[1] += 1
+        try:
+            channel[0].wait(timeout=timeout or _interval())
+        finally:
+            channel[1] -= 1
+            if channel[1] == 0:
+                del _channels[key]
+    return get_channel(key)
+
+def wait_for_progress(key, timeout=None):
+    """Wait for a local update (or one interval for other processes), then return progress"""
+    return wait_for_channel(key, timeout)[0]
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import threading
+import urllib.request
+from src.config.app import Config
+from src.server.services.ydlPool import borrow_ydl
+from src.server.services.postprocess import plan_mp4
+from src.server.services.youtube import prepare_youtube_download
+from src.server.services.facebook import prepare_facebook_download
+from src.server.services.tiktok import prepare_tiktok_download
+from src.server.utils.cacheCatalog import register_entry, new_etag_hash
+from src.server.utils.fileManager import find_cached_file
+from src.server.utils.singleFlight import try_begin_flight
+from src.server.utils.metrics import inc, in_flight
+from src.server.services.infoStore import process_info
+
+logger = logging.getLogger(__name__)
+
+# Các file đang được ghi trong tiến trình này, theo đường dẫn cache
+_fills = {}
+_fills_lock = threading.Lock()
+
+class CacheFill:
+    """A cache file being written from upstream while clients read it"""
+
+    def __init__(self, path, size=None):
+        self.path = path
+        self.tmp_path = path + '.stream'
+        self.size = size
+        self.written = 0
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def read(self):
+        """Yield the file from the start, waiting for bytes that are not written yet"""
+        position = 0
+        try:
+            while True:
+                with self.cond:
+                    while position >= self.written and not self.done and self.error is None:
+                        if not self.cond.wait(timeout=Config.STREAM_IDLE_TIMEOUT):
+                            raise TimeoutError(f"No upstream data for {Config.STREAM_IDLE_TIMEOUT}s")
+                    if self.error is not None:
+                        raise IOError(self.error)
+                    if position >= self.written:
+                        return
+
+                    # Đọc trong khoá để file không bị đổi tên giữa chừng (Windows)
+                    with open(self.path if self.done else self.tmp_path, 'rb') as f:
+                        f.seek(position)
+                        chunk = f.read(min(Config.STREAM_CHUNK_SIZE, self.written - position))
+                position += len(chunk)
+                yield chunk
+        finally:
+            inc('stream_bytes_total', position)
+
+def _prepare(video_url, platform, quality, format_id, cookie_file):
+    if platform == 'facebook':
+        ydl_opts, cache_path = prepare_facebook_download(video_url, quality, cookie_file)
+        return ydl_opts, cache_path, None
+    elif platform == 'tiktok':
+        ydl_opts, cache_path = prepare_tiktok_download(video_url, quality, cookie_file)
+        return ydl_opts, cache_path, None
+    return prepare_youtube_download(video_url, quality, cookie_file, format_id)
+
+def _is_single_file(info, ydl_opts):
+    """Whether the selected format can be written to the cache byte-for-byte"""
+    if info.get('requested_formats') or ydl_opts.get('postprocessors'):
+        return False
+    if info.get('protocol') not in ('http', 'https') or not info.get('url'):
+        return False
+    # Planner sẽ remux/transcode thì file cache khác với dữ liệu gốc
+    if ydl_opts.get('mp4_planner') and plan_mp4(info)[0] != 'skip':
+        return False
+    return True
+
+def _fill(key, fill, platform, ydl_opts, info, finish):
+    """Copy the upstream file into fill.tmp_path, then publish it in the cache"""
+    started = time.time()
+    try:
+        request = urllib.request.Request(info['url'], headers=info.get('http_headers') or {})
+        digest = new_etag_hash()
+        with in_flight('stream_fills_in_flight', platform=platform), \
+                borrow_ydl(platform, ydl_opts, 'download') as ydl, ydl.urlopen(request) as response:
+            with open(fill.tmp_path, 'wb') as f:
+                while True:
+                    chunk = response.read(Config.STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    f.flush()
+                    digest.update(chunk)
+                    with fill.cond:
+                        fill.written += len(chunk)
+                        fill.cond.notify_all()
+
+        with fill.cond:
+            os.replace(fill.tmp_path, fill.path)
+            fill.done = True
+            fill.cond.notify_all()
+        register_entry(fill.path, fill.written, digest.hexdigest())
+        logger.info(
+            f"Streamed {os.path.basename(fill.path)} ({fill.written} bytes) in {time.time() - started:.2f}s"
+        )
+    except Exception as e:
+        logger.warning(f"Stream-through failed for {os.path.basename(fill.path)}: {e}")
+        with fill.cond:
+            fill.error = str(e)
+            fill.cond.notify_all()
+            try:
+                os.remove(fill.tmp_path)
+            except OSError:
+                pass
+    finally:
+        with _fills_lock:
+            _fills.pop(key, None)
+        finish()
+
+def open_stream(video_url, platform, quality='best', format_id=None, cookie_file=None):
+    """Serve a download while it is being cached.
+
+    Returns ('file', path) on a cache hit, ('stream', CacheFill) when the bytes
+    can be piped through as they arrive, or None when the download needs
+    merging/post-processing and has to go through the job queue.
+    """
+    ydl_opts, cache_path, extensions = _prepare(video_url, platform, quality, format_id, cookie_file)
+
+    cached = find_cached_file(cache_path, extensions)
+    if cached:
+        inc('cache_lookups_total', result='hit')
+        return 'file', cached
+
+    with _fills_lock:
+        if cache_path in _fills:
+            return 'stream', _fills[cache_path]
+
+    with borrow_ydl(platform, ydl_opts, 'download') as ydl:
+        info = process_info(ydl, platform, video_url, download=False)
+        target = ydl.prepare_filename(info)
+    if not _is_single_file(info, ydl_opts):
+        return None
+
+    # Cùng lease với download_once để không tải trùng với job
+    finish = try_begin_flight(f"download:{os.path.basename(cache_path)}")
+    if finish is None:
+        # Request khác trong tiến trình này vừa bắt đầu stream cùng file
+        with _fills_lock:
+            if cache_path in _fills:
+                return 'stream', _fills[cache_path]
+        return None
+
+    # Tiến trình khác có thể vừa tải xong trước khi ta lấy được lease
+    cached = find_cached_file(cache_path, extensions)
+    if cached:
+        finish()
+        inc('cache_lookups_total', result='hit')
+        return 'file', cached
+
+    inc('cache_lookups_total', result='miss')
+    fill = CacheFill(target, info.get('filesize'))
+    with _fills_lock:
+        _fills[cache_path] = fill
+    threading.Thread(
+        target=_fill,
+        args=(cache_path, fill, platform, ydl_opts, info, finish),
+        name='stream-fill',
+        daemon=True
+    ).start()
+    return 'stream', fill
\ No newline at end of file
@@ -1,27 +1,41 @@
-import yt_dlp
-import os
 import re
 from src.config.constants import DEFAULT_USER_AGENT
 from src.server.utils.validators import is_ffmpeg_installed
-from src.server.utils.fileManager import get_cache_path
+from src.server.services.ydlPool import borrow_ydl, download_error
+from src.server.utils.fileManager import get_cache_path, get_postprocess_profile, download_once
+from src.server.utils.videoIds import get_tiktok_id
+from src.server.utils.metadataCache import get_or_fetch
+from src.server.services.tuning import get_transfer_options
+from src.server.utils.metrics import timer
+from src.server.services.infoStore import save_info, process_info
+from src.server.utils.cookieStore import get_cookie_file
+from src.server.utils.rateLimiter import throttle
 
 def get_tiktok_info(video_url, cookie_file=None):
     """Get information about a TikTok video with improved error handling"""
     if not validate_tiktok_url(video_url):
         raise ValueError("Invalid TikTok URL")
 
+    result = get_or_fetch('tiktok', extract_tiktok_id(video_url), lambda: _fetch_tiktok_info(video_url, cookie_file))
+    return dict(result, original_url=video_url)
+
+def _fetch_tiktok_info(video_url, cookie_file=None):
+    """Extract TikTok video information with yt-dlp"""
     # TikTok-specific options
     ydl_opts = {
         'quiet': True, 
         'no_warnings': True,
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'tiktok'),
     }
     
+    throttle('tiktok')
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        with borrow_ydl('tiktok', ydl_opts, 'info') as ydl:
+            with timer('extract_info_seconds', platform='tiktok'):
+                info = ydl.extract_info(video_url, download=False)
+            save_info('tiktok', video_url, ydl, info)
             
             result = {
                 'thumbnail': info.get('thumbnail'),
@@ -43,7 +57,7 @@ def get_tiktok_info(video_url, cookie_file=None):
             
             return result
             
-    except yt_dlp.utils.DownloadError as e:
+    except download_error() as e:
         error_msg = str(e)
         if "This video is private" in error_msg:
             raise ValueError("Video TikTok này là riêng tư")
@@ -54,22 +68,31 @@ def get_tiktok_info(video_url, cookie_file=None):
     except Exception as e:
         raise ValueError(f"Lỗi xảy ra: {str(e)}")
 
+def prepare_tiktok_download(video_url, quality='best', cookie_file=None):
+    """Build yt-dlp options and the cache path for a TikTok download"""
+    # Get download options
+    ydl_opts = get_tiktok_download_options(quality, cookie_file)
+    
+    # Set output path
+    cache_path = get_cache_path(video_url, ydl_opts['format'], get_postprocess_profile(ydl_opts), platform='tiktok')
+    ydl_opts['outtmpl'] = cache_path
+    return ydl_opts, cache_path
+
 def download_tiktok_video(video_url, quality='best', cookie_file=None):
     """Download a TikTok video with specified quality"""
     if not validate_tiktok_url(video_url):
         raise ValueError("Invalid TikTok URL")
         
-    # Get download options
-    ydl_opts = get_tiktok_download_options(quality, cookie_file)
+    ydl_opts, cache_path = prepare_tiktok_download(video_url, quality, cookie_file)
     
-    # Set output path
-    cache_path = get_cache_path(video_url, quality)
-    ydl_opts['outtmpl'] = cache_path
+    def download():
+        with borrow_ydl('tiktok', ydl_opts, 'download') as ydl:
+            info = process_info(ydl, 'tiktok', video_url)
+            return ydl.prepare_filename(info)
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
-            return ydl.prepare_filename(info)
+        # Nhiều người cùng tải một video thì chỉ một worker chạy yt-dlp
+        return download_once(cache_path, download)
     except Exception as e:
         raise ValueError(f"Không thể tải video: {str(e)}")
 
@@ -85,24 +108,26 @@ def get_tiktok_download_options(quality, cookie_file=None):
         'format': selected_format,
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'tiktok'),
     }
     
     # Add optimizations if FFmpeg is available
     if ffmpeg_available:
-        opts['postprocessors'] = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }]
+        # Chỉ chuyển mã khi codec không hợp với MP4, còn lại copy stream
+        opts['mp4_planner'] = True
     
+    opts.update(get_transfer_options('tiktok'))
     return opts
 
+def extract_tiktok_id(url):
+    """Extract TikTok video ID from a URL"""
+    return get_tiktok_id(url)
+
 def clean_tiktok_url(url):
     """Clean TikTok URL for embedding"""
     # Extract video ID for embedding
-    video_id_match = re.search(r'\/video\/(\d+)', url)
-    if video_id_match:
-        video_id = video_id_match.group(1)
+    video_id = extract_tiktok_id(url)
+    if video_id and video_id.isdigit():
         return f"https://www.tiktok.com/embed/v2/{video_id}"
     return url
 
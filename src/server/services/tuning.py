@@ -0,0 +1,148 @@
+import time
+import sqlite3
+import logging
+import threading
+from src.config.app import Config
+from src.config.constants import TRANSFER_TUNING
+from src.server.utils.sqliteStore import get_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfer_tuning (
+    platform TEXT PRIMARY KEY,
+    concurrency INTEGER NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    throughput REAL,
+    previous_throughput REAL,
+    jobs INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _conn():
+    return get_connection(schema=SCHEMA)
+
+def _defaults(platform):
+    return TRANSFER_TUNING.get(platform, TRANSFER_TUNING['youtube'])
+
+def _concurrency(platform):
+    """Learned fragment concurrency of a platform, re-read every TUNING_REFRESH seconds"""
+    now = time.time()
+    with _cache_lock:
+        cached = _cache.get(platform)
+        if cached and now - cached[0] < Config.TUNING_REFRESH:
+            return cached[1]
+
+    row = _conn().execute('SELECT concurrency FROM transfer_tuning WHERE platform = ?', (platform,)).fetchone()
+    concurrency = row['concurrency'] if row else _defaults(platform)['concurrent_fragment_downloads']
+    with _cache_lock:
+        _cache[platform] = (now, concurrency)
+    return concurrency
+
+def get_transfer_options(platform):
+    """yt-dlp options for fragment concurrency and HTTP chunk size of a platform"""
+    options = {'concurrent_fragment_downloads': _concurrency(platform)}
+    chunk_size = _defaults(platform)['http_chunk_size']
+    if chunk_size:
+        options['http_chunk_size'] = chunk_size
+    return options
+
+def _next_concurrency(row, limits, throughput, error_rate, failed):
+    """AIMD step: halve on errors, step up while throughput keeps improving"""
+    concurrency = row['concurrency']
+    if failed or error_rate > Config.TUNING_MAX_ERROR_RATE:
+        return max(limits['min_fragments'], concurrency // 2), True
+
+    if row['samples'] + 1 < Config.TUNING_SAMPLES:
+        return concurrency, False
+
+    previous = row['previous_throughput']
+    if previous is None or throughput >= previous * 1.05:
+        return min(limits['max_fragments'], concurrency + 1), True
+    if throughput < previous * 0.9:
+        return max(limits['min_fragments'], concurrency - 1), True
+    return concurrency, False
+
+def record_transfer(platform, downloaded_bytes, seconds, fragments, errors, failed=False):
+    """Feed one fragmented download's throughput and error count to the tuner.
+
+    Only fragmented protocols (HLS, DASH segments) are tuned: plain HTTP
+    downloads, including YouTube's default https formats fetched in
+    http_chunk_size ranges, are sequential and not affected by
+    concurrent_fragment_downloads, so they are ignored (fragments == 0).
+    """
+    if not fragments or (not failed and (downloaded_bytes < Config.TUNING_MIN_BYTES or seconds <= 0)):
+        return
+
+    limits = _defaults(platform)
+    throughput = downloaded_bytes / seconds if seconds > 0 else 0.0
+    error_rate = errors / fragments
+    conn = _conn()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            'INSERT OR IGNORE INTO transfer_tuning (platform, concurrency, updated_at) VALUES (?, ?, ?)',
+            (platform, limits['concurrent_fragment_downloads'], time.time())
+        )
+        row = conn.execute('SELECT * FROM transfer_tuning WHERE platform = ?', (platform,)).fetchone()
+
+        # Trung bình trượt của throughput ở mức concurrency hiện tại
+        if failed:
+            average = row['throughput']
+        elif row['throughput'] is None or row['samples'] == 0:
+            average = throughput
+        else:
+            average = row['throughput'] * 0.7 + throughput * 0.3
+
+        concurrency, changed = _next_concurrency(row, limits, average or 0.0, error_rate, failed)
+        if changed:
+            conn.execute(
+                'UPDATE transfer_tuning SET concurrency = ?, samples = 0, throughput = NULL, '
+                'previous_throughput = ?, jobs = jobs + 1, errors = errors + ?, updated_at = ? WHERE platform = ?',
+                (concurrency, average, errors, time.time(), platform)
+            )
+        else:
+            conn.execute(
+                'UPDATE transfer_tuning SET samples = samples + ?, throughput = ?, '
+                'jobs = jobs + 1, errors = errors + ?, updated_at = ? WHERE platform = ?',
+                (0 if failed else 1, average, errors, time.time(), platform)
+            )
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+    if changed:
+        logger.info(
+            f"Transfer tuning for {platform}: {row['concurrency']} -> {concurrency} fragments "
+            f"({(average or 0) / 1024 / 1024:.1f} MB/s, error rate {error_rate:.2%})"
+        )
+        with _cache_lock:
+            _cache.pop(platform, None)
+
+def get_tuning_stats():
+    """Return the learned settings of every platform"""
+    stats = {}
+    for platform, limits in TRANSFER_TUNING.items():
+        stats[platform] = {
+            'concurrent_fragment_downloads': limits['concurrent_fragment_downloads'],
+            'http_chunk_size': limits['http_chunk_size'],
+            'learned': False,
+        }
+    for row in _conn().execute('SELECT * FROM transfer_tuning'):
+        stats.setdefault(row['platform'], {'http_chunk_size': None}).update({
+            'concurrent_fragment_downloads': row['concurrency'],
+            'throughput': row['throughput'],
+            'previous_throughput': row['previous_throughput'],
+            'jobs': row['jobs'],
+            'errors': row['errors'],
+            'updated_at': row['updated_at'],
+            'learned': True,
+        })
+    return stats
\ No newline at end of file
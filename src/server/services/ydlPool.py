@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from src.config.app import Config
+from src.server.services.postprocess import build_downloader, get_planner_class
+from src.server.services.progress import attach_relay, current_reporter
+
+logger = logging.getLogger(__name__)
+
+# Các tuỳ chọn được đặt lại mỗi lần mượn, không tính vào khoá của pool
+PER_CALL_OPTIONS = ('outtmpl', 'concurrent_fragment_downloads', 'http_chunk_size')
+
+# Extractor của các nền tảng hỗ trợ, nạp sẵn khi warm-up
+WARM_UP_EXTRACTORS = ('Youtube', 'YoutubeTab', 'Facebook', 'FacebookReel', 'TikTok', 'Generic')
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pid = {'value': None}
+_stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+def _pool_key(platform, profile, ydl_opts):
+    """Key a pool by platform, option profile, cookie file and the remaining options"""
+    stable = {key: value for key, value in ydl_opts.items() if key not in PER_CALL_OPTIONS}
+    return (
+        platform,
+        profile,
+        ydl_opts.get('cookiefile'),
+        json.dumps(stable, sort_keys=True, default=str),
+    )
+
+def _close(ydl):
+    try:
+        ydl.__exit__(None, None, None)
+    except Exception:
+        pass
+
+def _take(key, ydl_opts):
+    with _pools_lock:
+        # Không dùng lại instance tạo trước khi fork
+        if _pid['value'] != os.getpid():
+            _pools.clear()
+            _pid['value'] = os.getpid()
+
+        idle = _pools.setdefault(key, [])
+        while idle:
+            entry = idle.pop()
+            if time.time() - entry[2] < Config.YDL_POOL_MAX_AGE:
+                _stats['reused'] += 1
+                return entry
+            _stats['discarded'] += 1
+            _close(entry[0])
+
+        _stats['created'] += 1
+
+    ydl = build_downloader(ydl_opts)
+    return ydl, attach_relay(ydl), time.time()
+
+def _give_back(key, entry):
+    with _pools_lock:
+        idle = _pools.setdefault(key, [])
+        if _pid['value'] == os.getpid() and len(idle) < Config.YDL_POOL_SIZE:
+            idle.append(entry)
+            return
+        _stats['discarded'] += 1
+    _close(entry[0])
+
+@contextmanager
+def borrow_ydl(platform, ydl_opts, profile='default'):
+    """Borrow a pre-configured YoutubeDL for the given options.
+
+    Extractors, cookie jar, HTTP opener and parsed format selector are kept
+    between calls. Only per-call options (output template) are reset.
+    """
+    key = _pool_key(platform, profile, ydl_opts)
+    entry = _take(key, ydl_opts)
+    ydl, relay = entry[0], entry[1]
+
+    for name in PER_CALL_OPTIONS:
+        if name in ydl_opts:
+            ydl.params[name] = ydl_opts[name]
+    if 'outtmpl' in ydl_opts:
+        # yt-dlp chuẩn hoá outtmpl thành dict lúc khởi tạo, cần làm lại
+        ydl._parse_outtmpl()
+    # Tiến trình tải của job đang chạy trong thread này (nếu có)
+    relay.reporter = current_reporter()
+    try:
+        yield ydl
+    finally:
+        relay.reporter = None
+        _give_back(key, entry)
+
+def get_pool_stats():
+    """Return how many YoutubeDL instances were created, reused and discarded"""
+    with _pools_lock:
+        stats = dict(_stats)
+        stats['idle'] = sum(len(idle) for idle in _pools.values())
+        stats['pools'] = len(_pools)
+    return stats
+
+def clear_pool():
+    """Close every idle YoutubeDL instance"""
+    with _pools_lock:
+        idle = [entry[0] for pool in _pools.values() for entry in pool]
+        _pools.clear()
+    for ydl in idle:
+        _close(ydl)
+
+def download_error():
+    """yt-dlp's DownloadError class, for except clauses (imports yt-dlp on first use)"""
+    from yt_dlp.utils import DownloadError
+    return DownloadError
+
+def warm_up():
+    """Import yt-dlp, our extractors and post-processors before workers fork.
+
+    yt-dlp is otherwise loaded lazily by the first borrow_ydl(); calling this
+    in a preforking master lets every worker share the imported modules.
+    Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    import yt_dlp
+    get_planner_class()
+
+    ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
+    try:
+        for ie_key in WARM_UP_EXTRACTORS:
+            try:
+                ydl.get_info_extractor(ie_key)
+            except Exception as e:
+                logger.warning(f"Cannot load extractor {ie_key}: {e}")
+    finally:
+        _close(ydl)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"yt-dlp warmed up in {elapsed:.2f}s")
+    return elapsed
\ No newline at end of file
@@ -1,10 +1,16 @@
-import yt_dlp
 import os
-import re
-import hashlib
 from src.config.constants import QUALITY_MAP, DEFAULT_USER_AGENT
 from src.server.utils.validators import is_ffmpeg_installed
-from src.server.utils.fileManager import get_cache_path
+from src.server.services.ydlPool import borrow_ydl
+from src.server.utils.fileManager import get_cache_path, get_postprocess_profile, download_once
+from src.server.utils.videoIds import get_youtube_id
+from src.server.utils.metadataCache import get_or_fetch
+from src.server.utils.formatTable import FormatTable, quality_ladder, bitrate_label
+from src.server.services.tuning import get_transfer_options
+from src.server.utils.metrics import timer
+from src.server.services.infoStore import save_info, process_info
+from src.server.utils.cookieStore import get_cookie_file
+from src.server.utils.rateLimiter import throttle
 
 DEBUG = os.environ.get('YOUTUBE_DEBUG', '0') == '1'
 
@@ -21,6 +27,13 @@ def get_youtube_info(video_url, cookie_file=None):
     if not validate_youtube_url(video_url):
         raise ValueError("Invalid YouTube URL")
     
+    # Dùng cache chung theo video ID để nhiều URL/người dùng chỉ trích xuất một lần
+    video_id = extract_youtube_id(video_url)
+    result = get_or_fetch('youtube', video_id, lambda: _fetch_youtube_info(video_url, cookie_file))
+    return dict(result, original_url=video_url)
+
+def _fetch_youtube_info(video_url, cookie_file=None):
+    """Extract YouTube video information with yt-dlp"""
     # Kiểm tra nếu là YouTube Shorts
     is_shorts = is_youtube_shorts(video_url)
     
@@ -30,7 +43,7 @@ def get_youtube_info(video_url, cookie_file=None):
         'no_warnings': True,
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'youtube'),
     }
     
     # Thêm tùy chọn đặc biệt cho shorts để cố gắng lấy chất lượng cao nhất
@@ -45,9 +58,12 @@ def get_youtube_info(video_url, cookie_file=None):
             }
         })
     
+    throttle('youtube')
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        with borrow_ydl('youtube', ydl_opts, 'shorts' if is_shorts else 'info') as ydl:
+            with timer('extract_info_seconds', platform='youtube'):
+                info = ydl.extract_info(video_url, download=False)
+            save_info('youtube', video_url, ydl, info)
             
             # Tạo YouTube embed URL
             video_id = info.get('id')
@@ -56,53 +72,11 @@ def get_youtube_info(video_url, cookie_file=None):
             else:
                 embed_url = f"https://www.youtube.com/embed/{video_id}" if video_id else None
             
-            # Extract available formats
-            formats = info.get('formats', [])
-            
-            # Lọc các format hữu ích và sắp xếp theo chất lượng
-            video_formats = []
-            for fmt in formats:
-                # Bỏ qua các format không có video hoặc chỉ là audio
-                if fmt.get('vcodec') == 'none' or fmt.get('acodec') == 'none':
-                    continue
-                    
-                # Thu thập thông tin format
-                format_info = {
-                    'format_id': fmt.get('format_id'),
-                    'ext': fmt.get('ext'),
-                    'height': fmt.get('height'),
-                    'width': fmt.get('width'),
-                    'fps': fmt.get('fps'),
-                    'tbr': fmt.get('tbr', 0),  # Tổng bitrate
-                    'filesize': fmt.get('filesize'),
-                    'format_note': fmt.get('format_note', ''),
-                    'vcodec': fmt.get('vcodec'),
-                    'acodec': fmt.get('acodec')
-                }
-                
-                if format_info['height'] and format_info['width']:
-                    video_formats.append(format_info)
-            
-            # Sắp xếp theo độ phân giải và bitrate
-            video_formats = sorted(
-                video_formats, 
-                key=lambda x: (x.get('height', 0), x.get('tbr', 0)), 
-                reverse=True
-            )
-            
-            # Nhóm các format theo độ phân giải
-            resolution_groups = {}
-            for fmt in video_formats:
-                height = fmt.get('height')
-                if height:
-                    if height not in resolution_groups:
-                        resolution_groups[height] = []
-                    resolution_groups[height].append(fmt)
+            # Bảng format gọn, dựng một lần cho mọi truy vấn bên dưới
+            table = FormatTable(info.get('formats') or [])
             
-            # Chỉ lấy format tốt nhất cho mỗi độ phân giải (bitrate cao nhất)
-            best_formats = {}
-            for height, formats_group in resolution_groups.items():
-                best_formats[height] = max(formats_group, key=lambda x: x.get('tbr', 0))
+            # Format có cả video và audio, bitrate cao nhất cho mỗi độ phân giải
+            best_formats = table.best_per_height(muxed=True, sized=True)
             
             # Generate quality options
             qualities = []
@@ -114,24 +88,18 @@ def get_youtube_info(video_url, cookie_file=None):
             qualities.append({'value': 'best', 'label': 'Tốt nhất (cao nhất có sẵn)'})
             qualities.append({'value': 'original', 'label': 'Định dạng gốc (không chuyển đổi)'})
             
-            # Thêm phân loại theo độ phân giải
-            for height in sorted(best_formats.keys(), reverse=True):
-                fmt = best_formats[height]
-                bitrate = fmt.get('tbr', 0)
-                extension = fmt.get('ext', 'mp4')
-                fps = fmt.get('fps', '')
+            def label(height, fmt, tbr):
+                fps = fmt.get('fps')
                 fps_str = f"{fps}fps " if fps else ""
-                
-                bitrate_str = f" ({int(bitrate)}kbps)" if bitrate else ""
-                
-                # Thêm chi tiết định dạng cho các độ phân giải phổ biến
-                if height in standard_resolutions:
-                    label = f"{height}p {fps_str}[{extension}]{bitrate_str}"
-                    qualities.append({
-                        'value': str(height),
-                        'label': label,
-                        'format_id': fmt.get('format_id')
-                    })
+                return f"{height}p {fps_str}[{fmt.get('ext') or 'mp4'}]{bitrate_label(tbr)}"
+            
+            # Thêm chi tiết định dạng cho các độ phân giải phổ biến
+            qualities.extend(quality_ladder(
+                table,
+                best_formats,
+                label,
+                keep=lambda height, count: height in standard_resolutions
+            ))
             
             # Thêm tùy chọn chỉ tải audio
             qualities.append({'value': 'audio', 'label': 'Chỉ âm thanh (MP3)'})
@@ -148,9 +116,9 @@ def get_youtube_info(video_url, cookie_file=None):
                 'upload_date': info.get('upload_date'),
                 'qualities': qualities,
                 'ffmpeg_installed': is_ffmpeg_installed(),
-                'format_detail': best_formats,  # Lưu chi tiết format để sử dụng sau
+                'format_detail': {height: table.detail(i) for height, i in best_formats.items()},  # Lưu chi tiết format để sử dụng sau
                 'is_shorts': is_shorts,
-                'available_resolutions': sorted(list(best_formats.keys()), reverse=True)
+                'available_resolutions': list(best_formats)
             }
             
             return result
@@ -164,11 +132,8 @@ def get_youtube_info(video_url, cookie_file=None):
         else:
             raise ValueError(f"Không thể xử lý video YouTube: {e}")
 
-def download_youtube_video(video_url, quality='best', cookie_file=None, format_id=None):
-    """Download a YouTube video with specified quality"""
-    if not validate_youtube_url(video_url):
-        raise ValueError("Invalid YouTube URL")
-    
+def prepare_youtube_download(video_url, quality='best', cookie_file=None, format_id=None):
+    """Build yt-dlp options and the cache path for a YouTube download"""
     # Kiểm tra FFmpeg
     ffmpeg_available = is_ffmpeg_installed()
     
@@ -199,16 +164,12 @@ def download_youtube_video(video_url, quality='best', cookie_file=None, format_i
     else:
         selected_format = 'bestvideo+bestaudio/best'
     
-    # Thiết lập đường dẫn cache
-    cache_path = get_cache_path(video_url, quality if not format_id else f"{quality}_{format_id}")
-    
     # Tùy chọn nâng cao cho YouTube
     ydl_opts = {
         'format': selected_format,
-        'outtmpl': cache_path if quality != 'original' else os.path.splitext(cache_path)[0] + '.%(ext)s',
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'youtube'),
         'quiet': not DEBUG,
         # Thêm các tùy chọn để cố gắng lấy chất lượng cao cho shorts
         'prefer_insecure': True,
@@ -219,6 +180,8 @@ def download_youtube_video(video_url, quality='best', cookie_file=None, format_i
             }
         }
     }
+    # Tải nhiều fragment DASH song song, mức song song do bộ tự điều chỉnh học được
+    ydl_opts.update(get_transfer_options('youtube'))
     
     # Thêm xử lý hậu kỳ nếu có FFmpeg và không phải là định dạng gốc
     if ffmpeg_available:
@@ -229,18 +192,46 @@ def download_youtube_video(video_url, quality='best', cookie_file=None, format_i
                 'preferredquality': '192',
             }]
         elif quality != 'original':  # Không chuyển đổi nếu là định dạng gốc
-            ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }]
+            # Chỉ chuyển mã khi codec không hợp với MP4, còn lại copy stream
+            ydl_opts['mp4_planner'] = True
             ydl_opts['merge_output_format'] = 'mp4'
     
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    # Thiết lập đường dẫn cache theo video ID, format và xử lý hậu kỳ
+    cache_path = get_cache_path(
+        video_url,
+        selected_format,
+        get_postprocess_profile(ydl_opts),
+        ext='.mp3' if quality == 'audio' and ffmpeg_available else '.mp4',
+        platform='youtube'
+    )
+    ydl_opts['outtmpl'] = cache_path if quality != 'original' else os.path.splitext(cache_path)[0] + '.%(ext)s'
+    
+    # Audio và định dạng gốc có thể ra phần mở rộng khác .mp4
+    extensions = None
+    if quality == 'audio':
+        extensions = ['.mp3', '.m4a', '.webm']
+    elif quality == 'original':
+        extensions = ['.webm', '.mkv', '.m4a']
+    
+    return ydl_opts, cache_path, extensions
+
+def download_youtube_video(video_url, quality='best', cookie_file=None, format_id=None):
+    """Download a YouTube video with specified quality"""
+    if not validate_youtube_url(video_url):
+        raise ValueError("Invalid YouTube URL")
+    
+    ydl_opts, cache_path, extensions = prepare_youtube_download(video_url, quality, cookie_file, format_id)
+    
+    def download():
+        with borrow_ydl('youtube', ydl_opts, 'download') as ydl:
             if DEBUG:
-                print(f"Downloading with format: {selected_format}")
-            info = ydl.extract_info(video_url, download=True)
+                print(f"Downloading with format: {ydl_opts['format']}")
+            info = process_info(ydl, 'youtube', video_url)
             return ydl.prepare_filename(info)
+    
+    try:
+        # Nhiều người cùng tải một video thì chỉ một worker chạy yt-dlp
+        return download_once(cache_path, download, extensions)
     except Exception as e:
         error_msg = str(e)
         if "ffmpeg is not installed" in error_msg:
@@ -271,34 +262,22 @@ def get_youtube_download_options(quality, cookie_file=None):
         'format': selected_format,
         'noplaylist': True,
         'user_agent': DEFAULT_USER_AGENT,
-        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'cookiefile': get_cookie_file(cookie_file, 'youtube'),
     }
     
     # Add optimizations if FFmpeg is available and quality is NOT original
     if ffmpeg_available and quality != 'audio' and quality != 'original':
-        opts['postprocessors'] = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }]
+        # Chỉ chuyển mã khi codec không hợp với MP4, còn lại copy stream
+        opts['mp4_planner'] = True
         opts['merge_output_format'] = 'mp4'
     
+    opts.update(get_transfer_options('youtube'))
     return opts
 
 def extract_youtube_id(url):
     """Extract YouTube video ID from a URL"""
-    if not url:
-        return None
-        
-    # Handle youtu.be URLs
-    if 'youtu.be' in url:
-        return url.split('/')[-1].split('?')[0]
-        
-    # Handle youtube.com URLs
-    match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
-    if match:
-        return match.group(1)
-    
-    return None
+    # youtu.be, watch?v=, /shorts/, /embed/, /live/ đều trả về cùng một ID
+    return get_youtube_id(url)
 
 def validate_youtube_url(url):
     """Validate if URL is a YouTube video URL"""
@@ -316,21 +295,9 @@ def validate_youtube_url(url):
     
     return domain_match and has_video_id
 
-def get_cache_path(url, quality, is_shorts=False):
-    """Generate a unique cache path for a video URL and quality"""
-    # Thêm thông tin shorts vào hash để phân biệt
-    url_hash = hashlib.md5(f"{url}_{quality}_shorts_{is_shorts}".encode()).hexdigest()
-    
-    # Phần còn lại của hàm...
-    # Nếu là định dạng original, trả về không có phần mở rộng cụ thể
-    if quality == 'original':
-        return os.path.join(Config.CACHE_FOLDER, f"{url_hash}")
-    # Đối với audio, sử dụng .mp3
-    elif quality == 'audio':
-        return os.path.join(Config.CACHE_FOLDER, f"{url_hash}.mp3")
-    # Còn lại sử dụng .mp4
-    else:
-        return os.path.join(Config.CACHE_FOLDER, f"{url_hash}.mp4")
+def is_youtube_shorts(url):
+    """Check if a URL points to a YouTube Shorts video"""
+    return bool(url) and '/shorts/' in url.lower()
 
 def get_best_shorts_format(formats):
     """Tìm format tốt nhất cho YouTube Shorts"""
@@ -344,7 +311,7 @@ def get_best_shorts_format(formats):
     
     # Tìm format có chiều cao cao nhất
     for fmt in formats:
-        height = fmt.get('height', 0)
+        height = fmt.get('height') or 0
         if height > best_height and fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none':
             best_height = height
             best_format = fmt
@@ -355,7 +322,7 @@ def get_best_shorts_format(formats):
         best_video_height = 0
         
         for fmt in formats:
-            height = fmt.get('height', 0)
+            height = fmt.get('height') or 0
             if height > best_video_height and fmt.get('vcodec') != 'none':
                 best_video_height = height
                 best_video = fmt
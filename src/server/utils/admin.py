@@ -0,0 +1,17 @@
+from functools import wraps
+from flask import jsonify
+from flask_login import current_user
+from src.config.app import Config
+
+def is_admin(user):
+    """Check if a user is listed in Config.ADMIN_USERNAMES"""
+    return bool(user and user.is_authenticated and user.username in Config.ADMIN_USERNAMES)
+
+def admin_required(view):
+    """Allow a view only for admin users"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin(current_user):
+            return jsonify({'error': 'Không có quyền truy cập'}), 403
+        return view(*args, **kwargs)
+    return wrapper
\ No newline at end of file
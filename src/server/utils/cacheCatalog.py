@@ -0,0 +1,194 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.singleFlight import try_acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    etag TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_access ON cache_entries (last_access);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_size INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO cache_totals (id) VALUES (1);
+CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+    UPDATE cache_totals SET total_size = total_size + NEW.size, entries = entries + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+    UPDATE cache_totals SET total_size = total_size - OLD.size, entries = entries - 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_resize AFTER UPDATE OF size ON cache_entries BEGIN
+    UPDATE cache_totals SET total_size = total_size - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+_janitor = {'pid': None}
+_janitor_lock = threading.Lock()
+_migrated = {'pid': None}
+
+def _conn():
+    conn = get_connection(schema=SCHEMA)
+    if _migrated['pid'] != os.getpid():
+        # Catalog cũ chưa có cột etag
+        try:
+            conn.execute('ALTER TABLE cache_entries ADD COLUMN etag TEXT')
+        except sqlite3.OperationalError:
+            pass
+        _migrated['pid'] = os.getpid()
+    return conn
+
+def new_etag_hash():
+    """Hash object used for content-derived ETags (feed it the file bytes)"""
+    return hashlib.blake2b(digest_size=16)
+
+def compute_etag(path):
+    """Hash a cache file's content into a strong ETag value"""
+    digest = new_etag_hash()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def register_entry(path, size=None, etag=None):
+    """Add (or refresh) a finished cache file in the catalog"""
+    if size is None:
+        size = os.path.getsize(path)
+    if etag is None:
+        etag = compute_etag(path)
+    now = time.time()
+    _conn().execute(
+        'INSERT INTO cache_entries (path, size, created_at, last_access, etag) VALUES (?, ?, ?, ?, ?) '
+        'ON CONFLICT(path) DO UPDATE SET size = excluded.size, last_access = excluded.last_access, '
+        'etag = excluded.etag',
+        (path, size, now, now, etag)
+    )
+
+def lookup_entry(path):
+    """Return the catalog entry for a path and record the access, or None"""
+    conn = _conn()
+    row = conn.execute('SELECT * FROM cache_entries WHERE path = ?', (path,)).fetchone()
+    if not row:
+        return None
+    conn.execute(
+        'UPDATE cache_entries SET last_access = ?, hits = hits + 1 WHERE path = ?',
+        (time.time(), path)
+    )
+    return dict(row)
+
+def get_etag(entry):
+    """Return the ETag of a catalog entry, hashing files found by sync_catalog on first use"""
+    if entry.get('etag'):
+        return entry['etag']
+    etag = compute_etag(entry['path'])
+    _conn().execute('UPDATE cache_entries SET etag = ? WHERE path = ?', (etag, entry['path']))
+    return etag
+
+def remove_entry(path, delete_file=True):
+    """Drop an entry from the catalog, deleting the file too by default"""
+    if delete_file:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _conn().execute('DELETE FROM cache_entries WHERE path = ?', (path,))
+
+def get_totals():
+    """Return total size, entry count and evictions without touching the disk"""
+    row = _conn().execute('SELECT total_size, entries, evictions FROM cache_totals WHERE id = 1').fetchone()
+    return dict(row)
+
+def clear_catalog():
+    """Forget all catalog entries"""
+    _conn().execute('DELETE FROM cache_entries')
+
+def evict(max_size=None, max_age=None):
+    """Delete expired entries, then least recently used ones until under max_size"""
+    max_size = Config.MAX_CACHE_SIZE if max_size is None else max_size
+    max_age = Config.CACHE_EXPIRY if max_age is None else max_age
+    conn = _conn()
+    evicted = []
+
+    expired = conn.execute(
+        'SELECT path FROM cache_entries WHERE last_access < ?', (time.time() - max_age,)
+    ).fetchall()
+    for row in expired:
+        remove_entry(row['path'])
+        evicted.append(row['path'])
+
+    total = get_totals()['total_size']
+    if total > max_size:
+        for row in conn.execute('SELECT path, size FROM cache_entries ORDER BY last_access ASC').fetchall():
+            if total <= max_size:
+                break
+            remove_entry(row['path'])
+            evicted.append(row['path'])
+            total -= row['size']
+
+    if evicted:
+        conn.execute('UPDATE cache_totals SET evictions = evictions + ? WHERE id = 1', (len(evicted),))
+        logger.info(f"Evicted {len(evicted)} cache file(s)")
+    return evicted
+
+def sync_catalog():
+    """Reconcile the catalog with the cache folder (run once at startup, not per request)"""
+    os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
+    conn = _conn()
+    known = {row['path'] for row in conn.execute('SELECT path FROM cache_entries')}
+    on_disk = set()
+
+    with os.scandir(Config.CACHE_FOLDER) as entries:
+        for entry in entries:
+            # Bỏ qua file tạm của yt-dlp và của stream-through
+            if not entry.is_file() or entry.name.endswith(('.part', '.ytdl', '.stream')) or '.temp.' in entry.name:
+                continue
+            on_disk.add(entry.path)
+            if entry.path not in known:
+                stat = entry.stat()
+                conn.execute(
+                    'INSERT OR IGNORE INTO cache_entries (path, size, created_at, last_access) VALUES (?, ?, ?, ?)',
+                    (entry.path, stat.st_size, stat.st_mtime, stat.st_mtime)
+                )
+
+    for path in known - on_disk:
+        remove_entry(path, delete_file=False)
+
+def _janitor_loop():
+    """Evict cache files in the background, one process at a time"""
+    first_run = True
+    while True:
+        try:
+            if try_acquire_lease('cache-janitor', Config.CACHE_JANITOR_INTERVAL):
+                try:
+                    if first_run:
+                        sync_catalog()
+                    evict()
+                finally:
+                    release_lease('cache-janitor')
+            first_run = False
+        except Exception:
+            logger.exception("Cache janitor failed")
+        time.sleep(Config.CACHE_JANITOR_INTERVAL)
+
+def start_cache_janitor():
+    """Start the background eviction thread for this process"""
+    with _janitor_lock:
+        if _janitor['pid'] == os.getpid():
+            return
+        _janitor['pid'] = os.getpid()
+        threading.Thread(target=_janitor_loop, name='cache-janitor', daemon=True).start()
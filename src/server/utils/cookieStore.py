@@ -0,0 +1,125 @@
+import os
+import hashlib
+import logging
+import threading
+from src.config.app import Config
+from src.config.constants import PLATFORMS
+
+logger = logging.getLogger(__name__)
+
+_HEADER = '# Netscape HTTP Cookie File\n'
+# Cookie HttpOnly được trình duyệt xuất ra dưới dạng dòng "comment"
+_HTTP_ONLY_PREFIX = '#HttpOnly_'
+
+# path -> {'stamp': (mtime_ns, size), 'valid': bool, 'lines': {platform: [...]}, 'files': {platform: path}}
+_parsed = {}
+_lock = threading.Lock()
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _matches(domain, domains):
+    domain = domain.lstrip('.').lower()
+    return any(domain == name or domain.endswith('.' + name) for name in domains)
+
+def _parse(path):
+    """Split a Netscape cookie file into the lines of each supported platform"""
+    lines = {platform: [] for platform in PLATFORMS}
+    valid = False
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if line.startswith('# Netscape HTTP Cookie File'):
+                valid = True
+                continue
+            stripped = line.strip()
+            if not stripped:
+                continue
+            domain = stripped
+            if domain.startswith(_HTTP_ONLY_PREFIX):
+                domain = domain[len(_HTTP_ONLY_PREFIX):]
+            elif domain.startswith('#'):
+                continue
+            parts = domain.split('\t')
+            if len(parts) < 7:
+                continue
+            valid = True
+            for platform, data in PLATFORMS.items():
+                if _matches(parts[0], data['domains']):
+                    lines[platform].append(stripped + '\n')
+    return valid, lines
+
+def _entry(path):
+    """Parsed form of a cookie file, parsed again only when its mtime or size changes"""
+    stamp = _stamp(path) if path else None
+    if stamp is None:
+        return None
+    with _lock:
+        entry = _parsed.get(path)
+        if entry and entry['stamp'] == stamp:
+            return entry
+    try:
+        valid, lines = _parse(path)
+    except OSError as e:
+        logger.warning(f"Cannot read cookie file {path}: {e}")
+        return None
+    entry = {'stamp': stamp, 'valid': valid, 'lines': lines, 'files': {}}
+    with _lock:
+        _parsed[path] = entry
+    logger.info(
+        f"Parsed cookie file {path}: "
+        + ', '.join(f"{platform} {len(platform_lines)}" for platform, platform_lines in lines.items())
+    )
+    return entry
+
+def is_valid_cookie_file(path):
+    """Cached is_netscape_cookie_file for the configured cookie file"""
+    entry = _entry(path)
+    return bool(entry and entry['valid'])
+
+def _write(path, platform, lines):
+    os.makedirs(Config.COOKIE_CACHE_FOLDER, exist_ok=True)
+    source = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    target = os.path.join(Config.COOKIE_CACHE_FOLDER, f"{platform}-{source}.txt")
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Cookie là thông tin đăng nhập: chỉ chủ sở hữu được đọc
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(_HEADER)
+        f.writelines(lines)
+    # Worker khác có thể đang ghi cùng nội dung: thay thế nguyên khối
+    os.replace(tmp_path, target)
+    return target
+
+def get_cookie_file(path, platform):
+    """cookiefile option for a platform: a small file with only that platform's cookies.
+
+    The source file is parsed once per change (mtime, size); yt-dlp then
+    loads a few dozen lines instead of a whole browser export. Returns None
+    when the file is missing, is not a Netscape cookie file or holds no
+    cookie for the platform.
+    """
+    entry = _entry(path)
+    if not entry or not entry['valid']:
+        return None
+
+    if platform in PLATFORMS:
+        lines = entry['lines'][platform]
+    else:
+        # Nền tảng chưa biết: giữ cookie của mọi nền tảng hỗ trợ
+        platform = 'all'
+        lines = [line for platform_lines in entry['lines'].values() for line in platform_lines]
+    if not lines:
+        return None
+
+    cookie_file = entry['files'].get(platform)
+    if cookie_file is None:
+        try:
+            cookie_file = entry['files'][platform] = _write(path, platform, lines)
+        except OSError as e:
+            logger.warning(f"Cannot write {platform} cookies, using {path}: {e}")
+            return path
+    return cookie_file
\ No newline at end of file
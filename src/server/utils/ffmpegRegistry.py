@@ -0,0 +1,132 @@
+import os
+import re
+import time
+import shutil
+import signal
+import logging
+import threading
+import subprocess
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ffmpeg_registry (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO ffmpeg_registry (id) VALUES (1);
+"""
+
+_state = {'capabilities': None, 'generation': None, 'checked_at': 0.0}
+# RLock vì handler SIGHUP có thể chạy khi main thread đang giữ khoá
+_lock = threading.RLock()
+
+def _run(args):
+    try:
+        proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
+        return proc.returncode, proc.stdout.decode('utf-8', errors='ignore')
+    except (OSError, subprocess.SubprocessError):
+        return None, ''
+
+def _bundled_binary(name):
+    """Path of a binary in the bundled ffmpeg essentials build"""
+    exe = f"{name}.exe" if os.name == 'nt' else name
+    return os.path.join(Config.FFMPEG_BUNDLED_DIR, 'bin', exe)
+
+def _parse_names(output):
+    """Parse codec/muxer names from `ffmpeg -encoders` / `-muxers` output"""
+    names = set()
+    for line in output.splitlines():
+        # Dòng dạng " V....D libx264   H.264 ..." hoặc "  E mp4   MP4 ..."
+        match = re.match(r'^\s*[A-Z.]{1,6}\s+([\w,-]+)\s', line)
+        if match and match.group(1) != '=':
+            names.update(match.group(1).split(','))
+    return sorted(names)
+
+def probe_capabilities():
+    """Probe ffmpeg/ffprobe once and describe what they can do"""
+    bundled_ffmpeg = _bundled_binary('ffmpeg')
+    bundled_usable = os.path.isfile(bundled_ffmpeg) and _run([bundled_ffmpeg, '-version'])[0] == 0
+
+    # Ưu tiên bản ffmpeg đi kèm, sau đó tới ffmpeg trong PATH
+    ffmpeg_path = bundled_ffmpeg if bundled_usable else shutil.which('ffmpeg')
+    ffprobe_path = _bundled_binary('ffprobe') if bundled_usable else shutil.which('ffprobe')
+
+    capabilities = {
+        'available': False,
+        'ffmpeg_path': ffmpeg_path,
+        'ffprobe_path': ffprobe_path if ffprobe_path and os.path.isfile(ffprobe_path) else None,
+        'ffmpeg_location': os.path.dirname(ffmpeg_path) if ffmpeg_path else None,
+        'bundled_usable': bundled_usable,
+        'version': None,
+        'encoders': [],
+        'muxers': [],
+        'probed_at': time.time(),
+    }
+    if not ffmpeg_path:
+        return capabilities
+
+    returncode, output = _run([ffmpeg_path, '-hide_banner', '-version'])
+    if returncode != 0:
+        return capabilities
+
+    match = re.search(r'ffmpeg version (\S+)', output)
+    capabilities['available'] = True
+    capabilities['version'] = match.group(1) if match else None
+    capabilities['encoders'] = _parse_names(_run([ffmpeg_path, '-hide_banner', '-encoders'])[1])
+    capabilities['muxers'] = _parse_names(_run([ffmpeg_path, '-hide_banner', '-muxers'])[1])
+    return capabilities
+
+def _generation():
+    return get_connection(schema=SCHEMA).execute(
+        'SELECT generation FROM ffmpeg_registry WHERE id = 1'
+    ).fetchone()[0]
+
+def get_capabilities():
+    """Return cached ffmpeg capabilities, probing only at startup or after a refresh"""
+    now = time.time()
+    with _lock:
+        if _state['capabilities'] is not None and now - _state['checked_at'] < Config.FFMPEG_RECHECK_INTERVAL:
+            return _state['capabilities']
+
+        # Tiến trình khác có thể đã yêu cầu làm mới
+        try:
+            generation = _generation()
+        except Exception:
+            generation = _state['generation']
+        _state['checked_at'] = now
+
+        if _state['capabilities'] is None or generation != _state['generation']:
+            _state['capabilities'] = probe_capabilities()
+            _state['generation'] = generation
+            logger.info(
+                f"FFmpeg capabilities: available={_state['capabilities']['available']} "
+                f"version={_state['capabilities']['version']} bundled={_state['capabilities']['bundled_usable']}"
+            )
+        return _state['capabilities']
+
+def refresh_capabilities():
+    """Re-probe ffmpeg here and ask every other worker process to do the same"""
+    get_connection(schema=SCHEMA).execute(
+        'UPDATE ffmpeg_registry SET generation = generation + 1 WHERE id = 1'
+    )
+    with _lock:
+        _state['checked_at'] = 0.0
+    return get_capabilities()
+
+def install_refresh_signal():
+    """Refresh capabilities on SIGHUP (where the platform supports it).
+
+    Not under gunicorn: its master owns SIGHUP (reload) and refreshes from
+    the on_reload hook in gunicorn.conf.py instead.
+    """
+    if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+        return
+    if 'gunicorn' in os.environ.get('SERVER_SOFTWARE', ''):
+        return
+    try:
+        signal.signal(signal.SIGHUP, lambda signum, frame: refresh_capabilities())
+    except ValueError:
+        pass
@@ -1,56 +1,150 @@
 import os
-import time
+import re
 import hashlib
 import shutil
 from src.config.app import Config
+from src.server.utils.singleFlight import single_flight, is_lease_held_by_other
+from src.server.utils.videoIds import canonical_video_ref
+from src.server.utils.metrics import inc
+from src.server.utils.cacheCatalog import register_entry, lookup_entry, remove_entry, get_totals, clear_catalog, evict
 
-def get_cache_path(url, quality):
-    """Generate a unique cache path for a video URL and quality"""
-    # Create hash of URL + quality to avoid filename issues
-    url_hash = hashlib.md5(f"{url}_{quality}".encode()).hexdigest()
-    return os.path.join(Config.CACHE_FOLDER, f"{url_hash}.mp4")
+def get_postprocess_profile(ydl_opts):
+    """Describe the post-processing configured in yt-dlp options"""
+    steps = []
+    for pp in ydl_opts.get('postprocessors') or []:
+        target = pp.get('preferedformat') or pp.get('preferredcodec') or ''
+        steps.append(f"{pp.get('key')}:{target}")
+    if ydl_opts.get('mp4_planner'):
+        steps.append('mp4_planner')
+    if ydl_opts.get('merge_output_format'):
+        steps.append(f"merge:{ydl_opts['merge_output_format']}")
+    return ','.join(steps) or 'none'
 
-def clean_expired_cache():
-    """Remove expired files from cache directory"""
-    current_time = time.time()
+def get_cache_key(url, format_selector, postprocess='none', platform=None):
+    """Build a cache key from (platform, canonical video ID, format selector, post-processing)"""
+    platform, video_id = canonical_video_ref(url, platform)
     
-    try:
-        # If cache folder doesn't exist, create it
-        if not os.path.exists(Config.CACHE_FOLDER):
-            os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
-            return
-            
-        # Scan all files in cache directory
-        for filename in os.listdir(Config.CACHE_FOLDER):
-            file_path = os.path.join(Config.CACHE_FOLDER, filename)
+    # ID lạ (URL đã chuẩn hoá) thì băm lại cho an toàn với tên file
+    if not re.fullmatch(r'[0-9A-Za-z_-]{1,64}', video_id):
+        video_id = hashlib.md5(video_id.encode()).hexdigest()
+    
+    variant = hashlib.md5(f"{format_selector}|{postprocess}".encode()).hexdigest()[:12]
+    return f"{platform}-{video_id}-{variant}"
+
+def get_cache_path(url, format_selector, postprocess='none', ext='.mp4', platform=None):
+    """Generate a cache path shared by every URL variant of the same video and format"""
+    os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
+    cache_key = get_cache_key(url, format_selector, postprocess, platform)
+    return os.path.join(Config.CACHE_FOLDER, f"{cache_key}{ext}")
+
+def get_legacy_cache_names(url, quality, format_id=None):
+    """File names produced by the old md5(url + quality) cache scheme"""
+    qualities = [quality]
+    if format_id:
+        qualities.append(f"{quality}_{format_id}")
+    
+    names = []
+    for q in qualities:
+        names.append(hashlib.md5(f"{url}_{q}".encode()).hexdigest())
+        names.append(hashlib.md5((url + q).encode()).hexdigest())
+    return names
+
+def migrate_cache_file(legacy_name, new_cache_path):
+    """Rename a file cached under a legacy name to its canonical cache path.
+    
+    Returns the new path, or None if no legacy file exists. Duplicates of an
+    already-migrated file are removed instead of kept.
+    """
+    if not os.path.isdir(Config.CACHE_FOLDER):
+        return None
+        
+    new_base = os.path.splitext(new_cache_path)[0]
+    for filename in os.listdir(Config.CACHE_FOLDER):
+        base, ext = os.path.splitext(filename)
+        if base != legacy_name or ext in ('.part', '.ytdl'):
+            continue
             
-            # Skip directories
-            if os.path.isdir(file_path):
-                continue
-                
-            # Check if file is old enough to be deleted
-            file_modified = os.path.getmtime(file_path)
-            if current_time - file_modified > Config.CACHE_EXPIRY:
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Error deleting cache file {file_path}: {e}")
+        old_path = os.path.join(Config.CACHE_FOLDER, filename)
+        target = new_base + ext
+        try:
+            if os.path.exists(target):
+                os.remove(old_path)
+            else:
+                os.replace(old_path, target)
+                register_entry(target)
+            remove_entry(old_path, delete_file=False)
+            return target
+        except OSError as e:
+            print(f"Error migrating cache file {old_path}: {e}")
+    return None
+
+def _candidate_paths(cache_path, extensions=None):
+    base_path = os.path.splitext(cache_path)[0]
+    return [cache_path] + [base_path + ext for ext in extensions or []]
+
+def find_cached_file(cache_path, extensions=None):
+    """Return the finished file for a cache path, or None if not downloaded yet"""
+    # Tra catalog thay vì quét thư mục cache
+    for path in _candidate_paths(cache_path, extensions):
+        if lookup_entry(path):
+            if os.path.isfile(path):
+                return path
+            # File bị xoá ngoài catalog
+            remove_entry(path, delete_file=False)
+    return None
+
+def download_once(cache_path, download, extensions=None):
+    """Download into cache_path once, even if several workers ask at the same time.
+    
+    The first caller runs download(); the others wait for the finished file.
+    """
+    lease_name = f"download:{os.path.basename(cache_path)}"
+    
+    def lookup():
+        # File còn đang được tiến trình khác ghi thì chưa dùng được
+        if is_lease_held_by_other(lease_name):
+            return None
+        return find_cached_file(cache_path, extensions)
+    
+    produced = []
+    
+    def produce():
+        produced.append(True)
+        file_path = download()
+        
+        # Một số chế độ (audio, định dạng gốc) tạo file với phần mở rộng khác
+        for path in [file_path] + _candidate_paths(cache_path, extensions):
+            if path and os.path.isfile(path):
+                register_entry(path)
+                return path
+        return file_path
+    
+    file_path = single_flight(
+        lease_name,
+        lookup,
+        produce,
+        wait_timeout=Config.DOWNLOAD_WAIT_TIMEOUT,
+        category='download'
+    )
+    # Chờ worker khác tải xong cũng tính là trúng cache
+    inc('cache_lookups_total', result='miss' if produced else 'hit')
+    return file_path
+
+def clean_expired_cache():
+    """Remove expired and least recently used files from the cache catalog"""
+    try:
+        return evict()
     except Exception as e:
         print(f"Error cleaning cache: {e}")
+        return []
 
 def get_cache_size():
     """Get the total size of cache directory in bytes"""
-    total_size = 0
-    
     try:
-        for dirpath, dirnames, filenames in os.walk(Config.CACHE_FOLDER):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                total_size += os.path.getsize(file_path)
+        return get_totals()['total_size']
     except Exception as e:
         print(f"Error calculating cache size: {e}")
-        
-    return total_size
+        return 0
 
 def clear_all_cache():
     """Clear all files from cache directory"""
@@ -60,5 +154,6 @@ def clear_all_cache():
                 file_path = os.path.join(Config.CACHE_FOLDER, filename)
                 if os.path.isfile(file_path):
                     os.remove(file_path)
+        clear_catalog()
     except Exception as e:
         print(f"Error clearing cache: {e}")
\ No newline at end of file
@@ -0,0 +1,76 @@
+class FormatTable:
+    """A yt-dlp formats list with the ranking queries shared by the platform services.
+
+    Queries are single passes over the format dicts: nothing is copied or
+    sorted per format, and the result maps heights to row indexes.
+    """
+
+    __slots__ = ('formats',)
+
+    def __init__(self, formats=()):
+        self.formats = list(formats)
+
+    def __len__(self):
+        return len(self.formats)
+
+    def tbr(self, i):
+        """Total bitrate of a row, 0 when unknown"""
+        return self.formats[i].get('tbr') or 0
+
+    def best_per_height(self, muxed=False, sized=False):
+        """Row with the highest bitrate for each height, highest height first.
+
+        muxed keeps only formats with both video and audio; sized also
+        requires a known width. Storyboards (neither video nor audio) are
+        never ranked. Ties keep the first format listed.
+        """
+        best = {}
+        best_tbr = {}
+        for i, fmt in enumerate(self.formats):
+            get = fmt.get
+            height = get('height')
+            if not height:
+                continue
+            video = get('vcodec') != 'none'
+            audio = get('acodec') != 'none'
+            if not (video or audio) or (muxed and not (video and audio)) or (sized and not get('width')):
+                continue
+            height = int(height)
+            tbr = get('tbr') or 0
+            if height not in best or tbr > best_tbr[height]:
+                best[height] = i
+                best_tbr[height] = tbr
+        return {height: best[height] for height in sorted(best, reverse=True)}
+
+    def detail(self, i):
+        """Slim description of a row for the client"""
+        fmt = self.formats[i]
+        return {
+            'format_id': fmt.get('format_id'),
+            'ext': fmt.get('ext'),
+            'fps': fmt.get('fps'),
+            'tbr': self.tbr(i),
+        }
+
+def quality_ladder(table, best, label, keep=None):
+    """Quality options ({'value', 'label', 'format_id'}) for best-per-height rows.
+
+    label(height, fmt, tbr) builds the text from the row's format dict;
+    keep(height, count) decides whether a height is listed, count being how
+    many already are.
+    """
+    qualities = []
+    for height, i in best.items():
+        if keep and not keep(height, len(qualities)):
+            continue
+        fmt = table.formats[i]
+        qualities.append({
+            'value': str(height),
+            'label': label(height, fmt, table.tbr(i)),
+            'format_id': fmt.get('format_id'),
+        })
+    return qualities
+
+def bitrate_label(tbr):
+    """' (1234kbps)' or '' when the bitrate is unknown"""
+    return f" ({int(tbr)}kbps)" if tbr else ""
\ No newline at end of file
@@ -0,0 +1,148 @@
+import os
+import uuid
+import mimetypes
+from urllib.parse import quote
+from flask import Response, request, send_file
+from werkzeug.http import parse_range_header
+from src.config.app import Config
+from src.server.utils.metrics import observe
+
+# Quá nhiều đoạn thì gửi cả file, tránh bị dùng để khuếch đại tải
+MAX_RANGES = 16
+
+def _read_range(path, start, end):
+    """Yield bytes start..end (inclusive) of a file"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(Config.STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _byte_ranges(header, length):
+    """Parse a Range header into sorted, merged (start, end) pairs.
+
+    Returns None when the header should be ignored and [] when no range
+    can be satisfied.
+    """
+    parsed = parse_range_header(header)
+    if parsed is None or parsed.units != 'bytes':
+        return None
+
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:
+            start, stop = max(length + start, 0), length
+        stop = length if stop is None else min(stop, length)
+        if start < stop:
+            ranges.append([start, stop - 1])
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    if len(merged) > MAX_RANGES:
+        return None
+    return [tuple(r) for r in merged]
+
+def _content_disposition(download_name):
+    try:
+        download_name.encode('ascii')
+        return f'attachment; filename="{download_name}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(download_name)}"
+
+def _if_range_matches(etag, last_modified):
+    """Whether If-Range (if any) still matches the cached file"""
+    if 'If-Range' not in request.headers:
+        return True
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return int(if_range.date.timestamp()) == int(last_modified)
+    return False
+
+def send_media(path, etag, download_name=None):
+    """Serve a cached file with a strong ETag, conditional GET and byte ranges"""
+    stat = os.stat(path)
+    length = stat.st_size
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': f'"{etag}"',
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=3600',
+    }
+
+    # Client đã có đúng bản này
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+
+    ranges = None
+    if 'Range' in request.headers and _if_range_matches(etag, stat.st_mtime):
+        ranges = _byte_ranges(request.headers['Range'], length)
+
+    if ranges is None:
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            as_attachment=bool(download_name),
+            download_name=download_name,
+            conditional=False,
+            etag=False,
+            last_modified=stat.st_mtime
+        )
+        response.headers.update(headers)
+        observe('media_response_bytes', length, kind='full')
+        return response
+
+    if download_name:
+        headers['Content-Disposition'] = _content_disposition(download_name)
+
+    if not ranges:
+        headers['Content-Range'] = f'bytes */{length}'
+        return Response(status=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{end}/{length}'
+        headers['Content-Length'] = str(end - start + 1)
+        observe('media_response_bytes', end - start + 1, kind='range')
+        return Response(_read_range(path, start, end), status=206, mimetype=mimetype, headers=headers)
+
+    # Nhiều đoạn: multipart/byteranges
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f'--{boundary}\r\nContent-Type: {mimetype}\r\n'
+            f'Content-Range: bytes {start}-{end}/{length}\r\n\r\n'
+        ).encode('ascii')
+        for start, end in ranges
+    ]
+    closing = f'--{boundary}--\r\n'.encode('ascii')
+    headers['Content-Length'] = str(
+        sum(len(part) + end - start + 1 + 2 for part, (start, end) in zip(parts, ranges)) + len(closing)
+    )
+
+    observe('media_response_bytes', sum(end - start + 1 for start, end in ranges), kind='multipart')
+
+    def generate():
+        for part, (start, end) in zip(parts, ranges):
+            yield part
+            yield from _read_range(path, start, end)
+            yield b'\r\n'
+        yield closing
+
+    return Response(
+        generate(),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}',
+        headers=headers
+    )
\ No newline at end of file
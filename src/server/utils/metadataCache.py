@@ -0,0 +1,101 @@
+import json
+import time
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.singleFlight import single_flight
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata_cache (
+    cache_key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_metadata_cache_accessed ON metadata_cache (accessed_at);
+CREATE TABLE IF NOT EXISTS metadata_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def make_key(platform, video_id, namespace='info'):
+    """Build the cache key for a platform video ID"""
+    # namespace tách các dạng kết quả khác nhau cho cùng một video
+    return f"{namespace}:{platform}:{video_id}"
+
+def _incr(conn, name, amount=1):
+    conn.execute(
+        'INSERT INTO metadata_cache_stats (name, value) VALUES (?, ?) '
+        'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+        (name, amount)
+    )
+
+def get_cached_info(cache_key):
+    """Return cached video info or None if missing or expired"""
+    conn = get_connection(schema=SCHEMA)
+    now = time.time()
+    row = conn.execute(
+        'SELECT value, created_at FROM metadata_cache WHERE cache_key = ?', (cache_key,)
+    ).fetchone()
+    if not row or now - row['created_at'] > Config.METADATA_CACHE_TTL:
+        return None
+
+    conn.execute('UPDATE metadata_cache SET accessed_at = ? WHERE cache_key = ?', (now, cache_key))
+    return json.loads(row['value'])
+
+def store_info(cache_key, info):
+    """Store video info and evict expired / least recently used entries"""
+    conn = get_connection(schema=SCHEMA)
+    now = time.time()
+    conn.execute(
+        'INSERT OR REPLACE INTO metadata_cache (cache_key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+        (cache_key, json.dumps(info, default=str), now, now)
+    )
+    conn.execute('DELETE FROM metadata_cache WHERE created_at < ?', (now - Config.METADATA_CACHE_TTL,))
+
+    count = conn.execute('SELECT COUNT(*) FROM metadata_cache').fetchone()[0]
+    overflow = count - Config.METADATA_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        conn.execute(
+            'DELETE FROM metadata_cache WHERE cache_key IN '
+            '(SELECT cache_key FROM metadata_cache ORDER BY accessed_at ASC LIMIT ?)',
+            (overflow,)
+        )
+        _incr(conn, 'evictions', overflow)
+
+def get_or_fetch(platform, video_id, fetch, namespace='info'):
+    """Return cached info for a video, running fetch() once on a miss"""
+    if not video_id:
+        return fetch()
+
+    cache_key = make_key(platform, video_id, namespace)
+    fetched = []
+
+    def produce():
+        info = fetch()
+        store_info(cache_key, info)
+        fetched.append(True)
+        return info
+
+    info = single_flight(f"metadata:{cache_key}", lambda: get_cached_info(cache_key), produce, category='metadata')
+
+    conn = get_connection(schema=SCHEMA)
+    _incr(conn, 'misses' if fetched else 'hits')
+    return info
+
+def get_stats():
+    """Return hit/miss counters and current size of the metadata cache"""
+    conn = get_connection(schema=SCHEMA)
+    stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    for row in conn.execute('SELECT name, value FROM metadata_cache_stats'):
+        stats[row['name']] = row['value']
+    stats['entries'] = conn.execute('SELECT COUNT(*) FROM metadata_cache').fetchone()[0]
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+def clear_metadata_cache():
+    """Remove all cached video info"""
+    conn = get_connection(schema=SCHEMA)
+    conn.execute('DELETE FROM metadata_cache')
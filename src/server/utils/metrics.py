@@ -0,0 +1,267 @@
+import os
+import time
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.singleFlight import get_owner
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_counters (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, labels)
+);
+CREATE TABLE IF NOT EXISTS metric_histograms (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    buckets TEXT NOT NULL,
+    sum REAL NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, labels)
+);
+CREATE TABLE IF NOT EXISTS metric_gauges (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    value REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, labels, owner)
+);
+"""
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** n for n in range(16, 34, 2))  # 64 KB .. 8 GB
+
+# name -> (type, help, buckets)
+METRICS = {
+    'extract_info_seconds': ('histogram', 'yt-dlp extract_info latency (metadata only)', SECONDS_BUCKETS),
+    'download_seconds': ('histogram', 'Download job duration', SECONDS_BUCKETS),
+    'download_bytes': ('histogram', 'Size of files produced by download jobs', BYTES_BUCKETS),
+    'postprocess_seconds': ('histogram', 'FFmpeg post-processing time per post-processor', SECONDS_BUCKETS),
+    'media_response_bytes': ('histogram', 'Bytes sent per cached media response', BYTES_BUCKETS),
+    'downloads_total': ('counter', 'Finished download jobs by outcome', None),
+    'cache_lookups_total': ('counter', 'Media cache lookups by result', None),
+    'extracted_info_reuse_total': ('counter', 'Downloads started from a preview\'s saved info, by result', None),
+    'stream_bytes_total': ('counter', 'Bytes sent by stream-through responses', None),
+    'rate_limit_wait_seconds': ('histogram', 'Time spent waiting in the per-platform upstream rate limiter', SECONDS_BUCKETS),
+    'rate_limit_rejections_total': ('counter', 'Upstream requests refused because the limiter wait was too long', None),
+    'downloads_in_flight': ('gauge', 'Downloads currently running', None),
+    'stream_fills_in_flight': ('gauge', 'Stream-through cache fills currently running', None),
+}
+
+# Số liệu gom trong tiến trình, ghi xuống SQLite định kỳ
+_pending = {'counters': {}, 'histograms': {}}
+_gauges = {}
+_lock = threading.Lock()
+_flusher = {'pid': None}
+
+def _conn():
+    return get_connection(schema=SCHEMA)
+
+def _labels(labels):
+    return json.dumps(labels, sort_keys=True, separators=(',', ':'))
+
+def _ensure_flusher():
+    if _flusher['pid'] == os.getpid():
+        return
+    with _lock:
+        if _flusher['pid'] == os.getpid():
+            return
+        # Số liệu chưa ghi của tiến trình cha không thuộc về tiến trình con
+        _pending['counters'].clear()
+        _pending['histograms'].clear()
+        _gauges.clear()
+        _flusher['pid'] = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+def inc(name, value=1, **labels):
+    """Increase a counter"""
+    _ensure_flusher()
+    key = (name, _labels(labels))
+    with _lock:
+        _pending['counters'][key] = _pending['counters'].get(key, 0) + value
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram"""
+    _ensure_flusher()
+    bounds = METRICS[name][2]
+    key = (name, _labels(labels))
+    with _lock:
+        entry = _pending['histograms'].get(key)
+        if entry is None:
+            entry = _pending['histograms'][key] = {'buckets': [0] * len(bounds), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                entry['buckets'][i] += 1
+                break
+        entry['sum'] += value
+        entry['count'] += 1
+
+@contextmanager
+def timer(name, **labels):
+    """Observe how long the block takes, in seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+@contextmanager
+def in_flight(name, **labels):
+    """Count the block as in flight in a per-process gauge"""
+    _ensure_flusher()
+    key = (name, _labels(labels))
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _gauges[key] -= 1
+
+def flush():
+    """Write this process's pending counters, histograms and gauges to the shared database"""
+    with _lock:
+        counters = _pending['counters']
+        histograms = _pending['histograms']
+        _pending['counters'] = {}
+        _pending['histograms'] = {}
+        gauges = dict(_gauges)
+
+    conn = _conn()
+    now = time.time()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for (name, labels), value in counters.items():
+            conn.execute(
+                'INSERT INTO metric_counters (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT(name, labels) DO UPDATE SET value = value + excluded.value',
+                (name, labels, value)
+            )
+        for (name, labels), entry in histograms.items():
+            row = conn.execute(
+                'SELECT buckets FROM metric_histograms WHERE name = ? AND labels = ?', (name, labels)
+            ).fetchone()
+            buckets = entry['buckets']
+            if row:
+                buckets = [a + b for a, b in zip(json.loads(row['buckets']), buckets)]
+            conn.execute(
+                'INSERT INTO metric_histograms (name, labels, buckets, sum, count) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(name, labels) DO UPDATE SET buckets = excluded.buckets, '
+                'sum = sum + excluded.sum, count = count + excluded.count',
+                (name, labels, json.dumps(buckets), entry['sum'], entry['count'])
+            )
+        for (name, labels), value in gauges.items():
+            conn.execute(
+                'INSERT OR REPLACE INTO metric_gauges (name, labels, owner, value, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (name, labels, get_owner(), value, now)
+            )
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        # Ghi lại lần sau thay vì mất số liệu
+        with _lock:
+            for key, value in counters.items():
+                _pending['counters'][key] = _pending['counters'].get(key, 0) + value
+            for key, entry in histograms.items():
+                current = _pending['histograms'].setdefault(key, {'buckets': [0] * len(entry['buckets']), 'sum': 0.0, 'count': 0})
+                current['buckets'] = [a + b for a, b in zip(current['buckets'], entry['buckets'])]
+                current['sum'] += entry['sum']
+                current['count'] += entry['count']
+        raise
+
+def _flush_loop():
+    while True:
+        time.sleep(Config.METRICS_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception("Cannot flush metrics")
+
+def _format_labels(labels, extra=None):
+    labels = dict(json.loads(labels), **(extra or {}))
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items())
+    )
+    return '{' + pairs + '}'
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+def _format_value(value):
+    """Exact sample value: integers without exponent, other floats with full precision"""
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+def render(extra_gauges=None):
+    """Render every metric in the Prometheus text exposition format.
+
+    extra_gauges maps a name to (help, {labels_json: value}) for values read
+    from elsewhere at scrape time (cache size, evictions, ...).
+    """
+    flush()
+    conn = _conn()
+    lines = []
+    counters = {}
+    for row in conn.execute('SELECT name, labels, value FROM metric_counters ORDER BY name, labels'):
+        counters.setdefault(row['name'], []).append((row['labels'], row['value']))
+    histograms = {}
+    for row in conn.execute('SELECT * FROM metric_histograms ORDER BY name, labels'):
+        histograms.setdefault(row['name'], []).append(row)
+
+    # Gauge của tiến trình đã chết (không flush nữa) bị bỏ qua
+    fresh_after = time.time() - Config.METRICS_FLUSH_INTERVAL * 3
+    gauges = {}
+    for row in conn.execute(
+        'SELECT name, labels, SUM(value) AS value FROM metric_gauges WHERE updated_at >= ? '
+        'GROUP BY name, labels ORDER BY name, labels', (fresh_after,)
+    ):
+        gauges.setdefault(row['name'], []).append((row['labels'], row['value']))
+    conn.execute('DELETE FROM metric_gauges WHERE updated_at < ?', (fresh_after,))
+
+    prefix = Config.METRICS_PREFIX
+    for name, (kind, help_text, bounds) in METRICS.items():
+        full_name = f"{prefix}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        if kind == 'counter':
+            for labels, value in counters.get(name, []):
+                lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+        elif kind == 'gauge':
+            for labels, value in gauges.get(name, []):
+                lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+        else:
+            for row in histograms.get(name, []):
+                cumulative = 0
+                for bound, count in zip(bounds, json.loads(row['buckets'])):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(row['labels'], {'le': _format_bound(bound)})} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(row['labels'], {'le': '+Inf'})} {row['count']}")
+                lines.append(f"{full_name}_sum{_format_labels(row['labels'])} {_format_value(row['sum'])}")
+                lines.append(f"{full_name}_count{_format_labels(row['labels'])} {row['count']}")
+
+    for name, (help_text, values) in (extra_gauges or {}).items():
+        full_name = f"{prefix}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} gauge")
+        for labels, value in values.items():
+            lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+
+    return '\n'.join(lines) + '\n'
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config.app import Config
+
+logger = logging.getLogger(__name__)
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when too many password hashes are already waiting"""
+
+_state = {'pid': None, 'executor': None, 'slots': None}
+_state_lock = threading.Lock()
+
+def _executor():
+    """Get the hashing pool of this process, recreated after a fork"""
+    with _state_lock:
+        if _state['pid'] != os.getpid():
+            _state['pid'] = os.getpid()
+            _state['executor'] = ThreadPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash'
+            )
+            # Đang chạy + đang chờ
+            _state['slots'] = threading.BoundedSemaphore(Config.PASSWORD_HASH_MAX_PENDING)
+        return _state['executor'], _state['slots']
+
+def _run(fn, *args):
+    """Run fn on the hashing pool and wait for it; reject at once when the queue is full"""
+    executor, slots = _executor()
+    if not slots.acquire(blocking=False):
+        logger.warning("Password hashing queue is full, rejecting request")
+        raise PasswordHashingBusyError('Máy chủ đang bận, vui lòng thử lại sau giây lát')
+    try:
+        # bcrypt nhả GIL khi băm: request khác vẫn chạy, CPU dùng cho việc băm có giới hạn
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+def _hash(password):
+    import bcrypt
+    return bcrypt.hashpw(_to_bytes(password), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)).decode('ascii')
+
+def _verify(password, hashed):
+    hashed = _to_bytes(hashed)
+    if hashed.startswith(b'$2'):
+        import bcrypt
+        return bcrypt.checkpw(_to_bytes(password), hashed)
+    # Hash werkzeug (pbkdf2/scrypt) của tài khoản cũ
+    from werkzeug.security import check_password_hash
+    return check_password_hash(hashed.decode('utf-8'), password)
+
+def hash_password(password):
+    """bcrypt hash of a password with the configured cost, as text"""
+    return _run(_hash, password)
+
+def verify_password(password, hashed):
+    """Check a password against a bcrypt (or older werkzeug) hash"""
+    if not password or not hashed:
+        return False
+    return _run(_verify, password, hashed)
+
+def needs_rehash(hashed):
+    """Whether a hash should be replaced on the next successful login"""
+    parts = _to_bytes(hashed).split(b'$')
+    # $2b$<cost>$<salt+hash>
+    if len(parts) != 4 or not parts[1].startswith(b'2'):
+        return True
+    return int(parts[2]) != Config.BCRYPT_ROUNDS
+
+def busy_response(error):
+    """Error handler for PasswordHashingBusyError"""
+    return str(error), 503, {'Retry-After': '1'}
\ No newline at end of file
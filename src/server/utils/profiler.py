@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from flask import g, request
+from flask_login import current_user
+from src.config.app import Config
+from src.server.utils.admin import is_admin
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = interval or Config.PROFILE_INTERVAL
+        self.stacks = {}
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        """Write collapsed stacks (one 'frame;frame;frame count' line per stack)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+def _requested():
+    return request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+
+def _profile_path():
+    os.makedirs(Config.PROFILE_FOLDER, exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9_.-]+', '_', request.endpoint or 'unknown')
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{os.getpid()}-{threading.get_ident()}.collapsed"
+    return os.path.join(Config.PROFILE_FOLDER, name)
+
+def _start_profile():
+    # Chỉ đọc header/query: không có chi phí gì khi không bật
+    if not _requested() or not is_admin(current_user):
+        return
+    g.profiler = SamplingProfiler(threading.get_ident())
+    g.profiler.start()
+
+def _write_profile(profiler, path, label):
+    profiler.stop()
+    try:
+        profiler.write(path)
+        logger.info(f"Profiled {label}: {profiler.elapsed:.3f}s, {profiler.samples} samples -> {path}")
+    except OSError as e:
+        logger.error(f"Cannot write profile: {e}")
+
+def _finish_profile(response=None):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    try:
+        path = _profile_path()
+    except OSError as e:
+        profiler.stop()
+        logger.error(f"Cannot write profile: {e}")
+        return response
+    label = f"{request.method} {request.path}"
+
+    if response is not None:
+        response.headers['X-Profile-File'] = os.path.basename(path)
+        if response.is_streamed:
+            # after_request chạy trước khi body được sinh ra (NDJSON, stream, SSE):
+            # dừng khi response đóng để đo cả phần việc chậm
+            response.call_on_close(lambda: _write_profile(profiler, path, label))
+            return response
+
+    _write_profile(profiler, path, label)
+    if response is not None:
+        response.headers['X-Profile-Samples'] = str(profiler.samples)
+    return response
+
+def install_profiler(app):
+    """Let admins profile one request with an X-Profile: 1 header or ?profile=1"""
+    if not Config.PROFILE_ENABLED:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    # Request lỗi không qua after_request
+    app.teardown_request(lambda exc: _finish_profile())
\ No newline at end of file
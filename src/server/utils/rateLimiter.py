@@ -0,0 +1,112 @@
+import math
+import time
+import sqlite3
+import logging
+import threading
+from src.config.app import Config
+from src.config.constants import RATE_LIMITS, PLATFORMS
+from src.server.utils.sqliteStore import get_connection
+from src.server.utils.metrics import observe, inc
+
+logger = logging.getLogger(__name__)
+
+class RateLimitedError(RuntimeError):
+    """Raised when a platform's limiter would make a request wait longer than RATE_LIMIT_MAX_WAIT"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    platform TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Thời gian chờ cộng dồn của thread hiện tại (đọc bởi job)
+_waited = threading.local()
+
+def _conn():
+    return get_connection(schema=SCHEMA)
+
+def _overrides():
+    limits = {}
+    for item in Config.RATE_LIMIT_OVERRIDES.split(','):
+        platform, _, value = item.strip().partition('=')
+        if not value:
+            continue
+        try:
+            rate, _, burst = value.partition(':')
+            limits[platform.strip()] = {'rate': float(rate), 'burst': float(burst or rate)}
+        except ValueError:
+            logger.warning(f"Ignoring invalid rate limit override: {item!r}")
+    return limits
+
+_limits = dict(RATE_LIMITS, **_overrides())
+
+def get_limit(platform):
+    """(rate, burst) of a platform, or None when it is not limited"""
+    limit = _limits.get(platform)
+    if not Config.RATE_LIMIT_ENABLED or not limit or limit['rate'] <= 0:
+        return None
+    return limit['rate'], max(limit['burst'], 1)
+
+def throttle(platform, cost=1):
+    """Wait for a slot to send an upstream request to a platform, return the seconds waited.
+
+    Tokens refill at the platform's rate up to its burst. A caller reserves
+    its token in one short BEGIN IMMEDIATE transaction (the bucket may go
+    negative) and then sleeps outside it, so waiters across all workers
+    are served in arrival order without polling.
+    """
+    limit = get_limit(platform)
+    if limit is None:
+        return 0.0
+    rate, burst = limit
+
+    conn = _conn()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        now = time.time()
+        row = conn.execute(
+            'SELECT tokens, updated_at FROM rate_limit_buckets WHERE platform = ?', (platform,)
+        ).fetchone()
+        tokens = burst if row is None else min(burst, row['tokens'] + max(0.0, now - row['updated_at']) * rate)
+        wait = max(0.0, (cost - tokens) / rate)
+        if wait > Config.RATE_LIMIT_MAX_WAIT:
+            conn.execute('ROLLBACK')
+            inc('rate_limit_rejections_total', platform=platform)
+            name = PLATFORMS.get(platform, {}).get('name', platform)
+            raise RateLimitedError(
+                f"Đang có quá nhiều yêu cầu tới {name}, vui lòng thử lại sau",
+                # Thử lại lúc thời gian chờ không còn vượt giới hạn
+                max(1, math.ceil(wait - Config.RATE_LIMIT_MAX_WAIT))
+            )
+        conn.execute(
+            'INSERT OR REPLACE INTO rate_limit_buckets (platform, tokens, updated_at) VALUES (?, ?, ?)',
+            (platform, tokens - cost, now)
+        )
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+    if wait:
+        logger.debug(f"Rate limiter: waiting {wait:.2f}s for {platform}")
+        time.sleep(wait)
+    observe('rate_limit_wait_seconds', wait, platform=platform)
+    _waited.seconds = getattr(_waited, 'seconds', 0.0) + wait
+    return wait
+
+def take_waited():
+    """Seconds this thread waited in the limiter since the last call"""
+    waited = getattr(_waited, 'seconds', 0.0)
+    _waited.seconds = 0.0
+    return round(waited, 3)
+
+def rate_limited_response(error):
+    """Error handler for RateLimitedError"""
+    return {'error': str(error)}, 429, {'Retry-After': str(error.retry_after)}
\ No newline at end of file
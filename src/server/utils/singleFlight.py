@@ -0,0 +1,242 @@
+import os
+import time
+import uuid
+import socket
+import threading
+import sqlite3
+from contextlib import contextmanager
+from src.config.app import Config
+from src.server.utils.sqliteStore import get_connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS single_flight_stats (
+    category TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL DEFAULT 0,
+    coalesced INTEGER NOT NULL DEFAULT 0,
+    wait_seconds REAL NOT NULL DEFAULT 0,
+    max_wait_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+class SingleFlightTimeoutError(TimeoutError):
+    """Raised when another process still holds a live lease after the wait timeout"""
+
+_owner = {'pid': None, 'value': None}
+_owner_lock = threading.Lock()
+
+def get_owner():
+    """Identify the current worker process (evaluated after fork)"""
+    with _owner_lock:
+        if _owner['pid'] != os.getpid():
+            # Container khởi động lại thường giữ nguyên hostname và PID (thường là 1):
+            # thêm nonce để không nhận nhầm job/lease của tiến trình đã chết
+            _owner['value'] = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+            _owner['pid'] = os.getpid()
+        return _owner['value']
+
+# Khoá trong tiến trình để gom các thread cùng chờ một key: name -> [lock, số thread đang dùng]
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Kết quả chờ của lần gọi gần nhất trong thread hiện tại
+_last = threading.local()
+
+def _acquire_local(name, blocking=True):
+    """Take the in-process lock of name, returns False if blocking=False and it is busy"""
+    with _locks_guard:
+        entry = _locks.get(name)
+        if entry is None:
+            entry = _locks[name] = [threading.Lock(), 0]
+        entry[1] += 1
+    if entry[0].acquire(blocking):
+        return True
+    _drop_local(name, entry)
+    return False
+
+def _drop_local(name, entry):
+    with _locks_guard:
+        entry[1] -= 1
+        # Thread cuối cùng rời đi: bỏ khoá để _locks không phình theo số key
+        if entry[1] == 0 and _locks.get(name) is entry:
+            del _locks[name]
+
+def _release_local(name):
+    """Release the in-process lock of name taken by _acquire_local"""
+    with _locks_guard:
+        entry = _locks[name]
+    entry[0].release()
+    _drop_local(name, entry)
+
+@contextmanager
+def _local_lock(name):
+    _acquire_local(name)
+    try:
+        yield
+    finally:
+        _release_local(name)
+
+def try_acquire_lease(name, ttl):
+    """Try to take a cross-process lease, returns True if acquired"""
+    conn = get_connection(schema=SCHEMA)
+    now = time.time()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+        if row and row['expires_at'] > now and row['owner'] != get_owner():
+            conn.execute('ROLLBACK')
+            return False
+        conn.execute(
+            'INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)',
+            (name, get_owner(), now + ttl)
+        )
+        conn.execute('COMMIT')
+        return True
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+def release_lease(name):
+    """Release a lease held by this process"""
+    conn = get_connection(schema=SCHEMA)
+    conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, get_owner()))
+
+def is_lease_held_by_other(name):
+    """Check whether another process currently holds a live lease"""
+    conn = get_connection(schema=SCHEMA)
+    row = conn.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+    return bool(row and row['expires_at'] > time.time() and row['owner'] != get_owner())
+
+def _keep_lease(name, ttl, stop):
+    """Extend a lease until stop is set so long-running work keeps ownership"""
+    while not stop.wait(ttl / 3):
+        try:
+            get_connection(schema=SCHEMA).execute(
+                'UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?',
+                (time.time() + ttl, name, get_owner())
+            )
+        except sqlite3.Error:
+            pass
+
+def try_begin_flight(name, lease_ttl=None):
+    """Start producing name right now if nobody else is, without waiting.
+
+    Takes the in-process lock and the cross-process lease (kept alive in the
+    background). Returns a finish() callable that releases both, or None when
+    another thread or process is already producing.
+    """
+    lease_ttl = lease_ttl or Config.SINGLE_FLIGHT_LEASE_TTL
+    if not _acquire_local(name, blocking=False):
+        return None
+    try:
+        acquired = try_acquire_lease(name, lease_ttl)
+    except Exception:
+        _release_local(name)
+        raise
+    if not acquired:
+        _release_local(name)
+        return None
+
+    stop = threading.Event()
+    threading.Thread(target=_keep_lease, args=(name, lease_ttl, stop), daemon=True).start()
+
+    def finish():
+        stop.set()
+        try:
+            release_lease(name)
+        finally:
+            _release_local(name)
+    return finish
+
+def _record(category, waited, coalesced):
+    _last.flight = {'wait_seconds': round(waited, 3), 'coalesced': coalesced}
+    if not category:
+        return
+
+    conn = get_connection(schema=SCHEMA)
+    conn.execute(
+        'INSERT INTO single_flight_stats (category, calls, coalesced, wait_seconds, max_wait_seconds) '
+        'VALUES (?, 1, ?, ?, ?) '
+        'ON CONFLICT(category) DO UPDATE SET calls = calls + 1, '
+        'coalesced = coalesced + excluded.coalesced, '
+        'wait_seconds = wait_seconds + excluded.wait_seconds, '
+        'max_wait_seconds = MAX(max_wait_seconds, excluded.max_wait_seconds)',
+        (category, int(coalesced), waited, waited)
+    )
+
+def last_flight():
+    """Return wait time and coalescing of the last single_flight() call in this thread"""
+    return getattr(_last, 'flight', {'wait_seconds': 0.0, 'coalesced': False})
+
+def get_flight_stats():
+    """Return lock wait and coalescing counters per category"""
+    conn = get_connection(schema=SCHEMA)
+    stats = {}
+    for row in conn.execute('SELECT * FROM single_flight_stats'):
+        stats[row['category']] = {
+            'calls': row['calls'],
+            'coalesced': row['coalesced'],
+            'total_wait_seconds': round(row['wait_seconds'], 3),
+            'avg_wait_seconds': round(row['wait_seconds'] / row['calls'], 3) if row['calls'] else 0.0,
+            'max_wait_seconds': round(row['max_wait_seconds'], 3),
+        }
+    return stats
+
+def single_flight(name, lookup, produce, lease_ttl=None, wait_timeout=None, poll_interval=0.25, category=None):
+    """Run produce() once per name across threads and processes.
+
+    lookup() returns the finished value or None. Callers that lose the race wait
+    for the winner's result instead of repeating the work; produce() only runs
+    under the lease, and SingleFlightTimeoutError is raised if the winner is
+    still working after wait_timeout. When category is given, wait time and
+    coalesced calls are counted under that name.
+    """
+    lease_ttl = lease_ttl or Config.SINGLE_FLIGHT_LEASE_TTL
+    wait_timeout = wait_timeout or Config.SINGLE_FLIGHT_WAIT_TIMEOUT
+
+    value = lookup()
+    if value is not None:
+        _last.flight = {'wait_seconds': 0.0, 'coalesced': False}
+        return value
+
+    started = time.time()
+    with _local_lock(name):
+        value = lookup()
+        if value is not None:
+            _record(category, time.time() - started, True)
+            return value
+
+        deadline = started + wait_timeout
+        while True:
+            if try_acquire_lease(name, lease_ttl):
+                waited = time.time() - started
+                stop = threading.Event()
+                threading.Thread(target=_keep_lease, args=(name, lease_ttl, stop), daemon=True).start()
+                try:
+                    # Tiến trình khác có thể vừa hoàn thành trước khi ta lấy được lease
+                    value = lookup()
+                    coalesced = value is not None
+                    if value is None:
+                        value = produce()
+                    _record(category, waited, coalesced)
+                    return value
+                finally:
+                    stop.set()
+                    release_lease(name)
+
+            time.sleep(poll_interval)
+            value = lookup()
+            if value is not None:
+                _record(category, time.time() - started, True)
+                return value
+
+            # Chủ lease vẫn gửi heartbeat: làm lại song song sẽ ghi đè cùng file.
+            # Chủ lease chết thì lease hết hạn và vòng lặp trên tự giành lấy.
+            if time.time() > deadline:
+                _record(category, time.time() - started, False)
+                raise SingleFlightTimeoutError('Hết thời gian chờ tiến trình khác xử lý, vui lòng thử lại sau')
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+from src.config.app import Config
+
+# Mỗi thread giữ một connection riêng cho mỗi file database
+_local = threading.local()
+
+def _configure(conn):
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT)}')
+
+def get_connection(db_path=None, schema=None):
+    """Get a per-thread SQLite connection shared by all worker processes through the file"""
+    db_path = db_path or Config.STATE_DB_PATH
+    connections = getattr(_local, 'connections', None)
+
+    # Không dùng lại connection được tạo trước khi fork
+    if connections is None or getattr(_local, 'pid', None) != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    entry = connections.get(db_path)
+    if entry is None:
+        conn = sqlite3.connect(db_path, timeout=Config.SQLITE_BUSY_TIMEOUT / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        _configure(conn)
+        entry = connections[db_path] = {'conn': conn, 'schemas': set()}
+
+    # Tạo bảng một lần cho mỗi connection
+    if schema and schema not in entry['schemas']:
+        entry['conn'].executescript(schema)
+        entry['schemas'].add(schema)
+
+    return entry['conn']
+
+def close_connections():
+    """Close all connections opened by the current thread"""
+    connections = getattr(_local, 'connections', None) or {}
+    for entry in connections.values():
+        try:
+            entry['conn'].close()
+        except sqlite3.Error:
+            pass
+    _local.connections = {}
+
+
+def configure_engine(engine):
+    """Use the same WAL/busy-timeout settings for SQLAlchemy's SQLite connections"""
+    if engine.dialect.name != 'sqlite':
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        _configure(dbapi_connection)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.config.app import Config
+from src.server.models import User
+
+class UserIdentity(UserMixin):
+    """Detached snapshot of a User row: what current_user is used for in requests"""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+# user_id -> (identity, expires_at), theo thứ tự dùng gần nhất
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def load_identity(user_id):
+    """user_loader for flask-login: a dict lookup while the identity is cached"""
+    user_id = int(user_id)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry and entry[1] > now:
+            _cache.move_to_end(user_id)
+            return entry[0]
+
+    user = User.query.get(user_id)
+    if user is None:
+        return None
+    identity = UserIdentity(user)
+    with _lock:
+        _cache[user_id] = (identity, now + Config.USER_CACHE_TTL)
+        _cache.move_to_end(user_id)
+        while len(_cache) > Config.USER_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return identity
+
+def invalidate(user_id):
+    """Drop a cached identity so the next request reloads it"""
+    with _lock:
+        _cache.pop(int(user_id), None)
+
+def clear():
+    """Drop every cached identity"""
+    with _lock:
+        _cache.clear()
+
+def _mark_changed(mapper, connection, target):
+    # Chỉ xoá sau commit: xoá sớm hơn thì request khác có thể nạp lại dữ liệu cũ
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_changed(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate(user_id)
+
+event.listen(User, 'after_update', _mark_changed)
+event.listen(User, 'after_delete', _mark_changed)
\ No newline at end of file
@@ -1,15 +1,11 @@
-import subprocess
 import os
 import re
+from src.server.utils.ffmpegRegistry import get_capabilities
 
 def is_ffmpeg_installed():
     """Check if FFmpeg is installed on the system"""
-    try:
-        with subprocess.Popen(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-            proc.communicate()
-            return proc.returncode == 0
-    except (FileNotFoundError, subprocess.SubprocessError):
-        return False
+    # Đọc kết quả đã probe lúc khởi động thay vì chạy ffmpeg mỗi lần
+    return get_capabilities()['available']
 
 def is_valid_url(url):
     """Check if a URL is valid"""
@@ -0,0 +1,118 @@
+import re
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Tham số theo dõi/chia sẻ không ảnh hưởng tới nội dung video
+TRACKING_PARAMS = {
+    't', 'si', 'feature', 'pp', 'app', 'list', 'index', 'start_radio', 'ab_channel',
+    'fbclid', 'mibextid', 'rdid', 'share_url', 'sfnsn', 'ref', 'refsrc', '_rdr',
+    'is_from_webapp', 'sender_device', 'sender_web_id', 'lang', 'is_copy_url',
+}
+
+HOST_PREFIXES = ('www.', 'm.', 'web.', 'mobile.', 'music.')
+
+def _host(url):
+    host = (urlsplit(url).hostname or '').lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+def get_youtube_id(url):
+    """Extract the 11-character YouTube video ID from any YouTube URL variant"""
+    if not url:
+        return None
+
+    parts = urlsplit(url)
+    host = _host(url)
+
+    # youtu.be/ID
+    if host == 'youtu.be':
+        match = re.match(r'/([0-9A-Za-z_-]{11})', parts.path)
+        return match.group(1) if match else None
+
+    # watch?v=ID
+    video_id = dict(parse_qsl(parts.query)).get('v')
+    if video_id and re.fullmatch(r'[0-9A-Za-z_-]{11}', video_id):
+        return video_id
+
+    # /shorts/ID, /embed/ID, /live/ID, /v/ID
+    match = re.search(r'/(?:shorts|embed|live|v)/([0-9A-Za-z_-]{11})', parts.path)
+    if match:
+        return match.group(1)
+
+    return None
+
+def get_facebook_id(url):
+    """Extract the Facebook video ID (or fb.watch short code) from a URL"""
+    if not url:
+        return None
+
+    parts = urlsplit(url)
+
+    # fb.watch/CODE chỉ có mã rút gọn, không đổi được sang ID số khi không gọi mạng
+    if _host(url) == 'fb.watch':
+        code = parts.path.strip('/').split('/')[0]
+        return f"w_{code}" if code else None
+
+    video_id = dict(parse_qsl(parts.query)).get('v')
+    if video_id and video_id.isdigit():
+        return video_id
+
+    match = re.search(r'/(?:videos/(?:[^/]+/)?|reel/|watch/)(\d+)', parts.path)
+    if match:
+        return match.group(1)
+
+    return None
+
+def get_tiktok_id(url):
+    """Extract the numeric TikTok video ID (or vm.tiktok.com short code) from a URL"""
+    if not url:
+        return None
+
+    match = re.search(r'\/video\/(\d+)', url)
+    if match:
+        return match.group(1)
+
+    if (urlsplit(url).hostname or '').lower() in ('vm.tiktok.com', 'vt.tiktok.com'):
+        code = urlsplit(url).path.strip('/').split('/')[0]
+        return f"vm_{code}" if code else None
+
+    return None
+
+def normalize_url(url):
+    """Normalize a URL by dropping host prefixes, fragments and tracking parameters"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    normalized = f"{_host(url)}{path}"
+    if query:
+        normalized += '?' + urlencode(query)
+    return normalized
+
+def canonical_video_ref(url, platform=None):
+    """Return (platform, video_id) that is the same for every URL variant of a video"""
+    host = _host(url)
+    if not platform or platform == 'auto':
+        if host in ('youtube.com', 'youtu.be', 'youtube-nocookie.com'):
+            platform = 'youtube'
+        elif host in ('facebook.com', 'fb.com', 'fb.watch'):
+            platform = 'facebook'
+        elif host.endswith('tiktok.com'):
+            platform = 'tiktok'
+        else:
+            platform = 'generic'
+
+    if platform == 'youtube':
+        video_id = get_youtube_id(url)
+    elif platform == 'facebook':
+        video_id = get_facebook_id(url)
+    elif platform == 'tiktok':
+        video_id = get_tiktok_id(url)
+    else:
+        video_id = None
+
+    # Không nhận ra ID thì dùng URL đã chuẩn hoá
+    return platform, video_id or normalize_url(url)
@@ -3,9 +3,24 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
 from src.config.app import Config
-from src.server.models import db, User, init_db
+from src.server.models import db, init_db
+from src.server.utils.sqliteStore import configure_engine
+from src.server.utils.userCache import load_identity
+from src.server.services.history import migrate_schema
 from src.server.routes.pages import register_page_routes
 from src.server.routes.api import register_api_routes
+from src.server.routes.jobs import jobs
+from src.server.routes.admin import admin
+from src.server.routes.preview import preview
+from src.server.routes.stream import stream
+from src.server.routes.metrics import metrics
+from src.server.utils.profiler import install_profiler
+from src.server.utils.passwords import PasswordHashingBusyError, busy_response
+from src.server.utils.rateLimiter import RateLimitedError, rate_limited_response
+from src.server.utils.ffmpegRegistry import get_capabilities, install_refresh_signal
+from src.server.services.jobs import start_job_workers
+from src.server.services.ydlPool import warm_up
+from src.server.utils.cacheCatalog import start_cache_janitor
 
 def create_app():
     app = Flask(__name__, 
@@ -15,6 +30,10 @@ def create_app():
     
     # Setup database
     db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine)
+        # Cột download_count phải có trước truy vấn User đầu tiên
+        migrate_schema()
     
     # Setup login manager
     login_manager = LoginManager(app)
@@ -22,11 +41,38 @@ def create_app():
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Không truy vấn database ở mỗi request đã đăng nhập
+        return load_identity(user_id)
     
     # Register routes
     register_page_routes(app)
     register_api_routes(app)
+    app.register_blueprint(jobs)
+    app.register_blueprint(admin)
+    app.register_blueprint(preview)
+    app.register_blueprint(stream)
+    app.register_blueprint(metrics)
+    
+    # Admin-only sampling profiler, off unless a request asks for it
+    install_profiler(app)
+    
+    # Hàng đợi băm mật khẩu đầy: trả 503 ngay thay vì giữ worker
+    app.register_error_handler(PasswordHashingBusyError, busy_response)
+    
+    # Giới hạn tốc độ tới nền tảng: trả 429 kèm Retry-After
+    app.register_error_handler(RateLimitedError, rate_limited_response)
+    
+    # Probe FFmpeg once at startup, refresh on SIGHUP or /api/admin/ffmpeg/refresh
+    get_capabilities()
+    install_refresh_signal()
+    
+    # yt-dlp được nạp khi cần; master của server prefork nạp sẵn để worker dùng chung
+    if Config.WARM_UP_YT_DLP:
+        warm_up()
+    
+    # Start background download workers and cache eviction
+    start_job_workers()
+    start_cache_janitor()
     
     return app
 
@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-import bcrypt
+from src.server.utils.passwords import hash_password, verify_password, needs_rehash
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -13,10 +13,15 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime, default=None, nullable=True)
     
     def set_password(self, password):
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        self.password = hash_password(password).encode('ascii')
         
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password)
+        """Verify a password, upgrading its hash when the configured cost changed (caller commits)"""
+        if not verify_password(password, self.password):
+            return False
+        if needs_rehash(self.password):
+            self.set_password(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -4,10 +4,16 @@ import os
 import time
 import traceback
 
-from src.server.services.download import get_video_info, download_video, detect_platform
+from src.server.services.download import get_video_info, detect_platform
 from src.server.utils.validators import is_valid_url, is_netscape_cookie_file
-from src.server.utils.fileManager import get_cache_path, clean_expired_cache
-from src.server.models import DownloadHistory, db
+from src.server.utils.cookieStore import is_valid_cookie_file
+from src.server.utils.cacheCatalog import get_totals as get_cache_totals
+from src.server.utils.metadataCache import get_stats as get_metadata_cache_stats
+from src.server.utils.singleFlight import get_flight_stats
+from src.server.services.history import record_download
+from src.server.services.jobs import register_job_listener, FINISHED
+from src.server.routes.jobs import enqueue_download
+from src.server.utils.rateLimiter import RateLimitedError, take_waited
 from src.config.app import Config
 from src.config.constants import ERROR_MESSAGES, SUPPORTED_PLATFORMS
 
@@ -29,7 +35,7 @@ def register_api_routes(app):
             return jsonify({'error': ERROR_MESSAGES['invalid_url']}), 400
             
         # Check cookie file format if it exists
-        if os.path.exists(Config.COOKIE_FILE) and not is_netscape_cookie_file(Config.COOKIE_FILE):
+        if os.path.exists(Config.COOKIE_FILE) and not is_valid_cookie_file(Config.COOKIE_FILE):
             return jsonify({'error': ERROR_MESSAGES['cookie_format']}), 400
             
         # Auto-detect platform if not specified or set to auto
@@ -42,6 +48,8 @@ def register_api_routes(app):
         if platform not in SUPPORTED_PLATFORMS:
             return jsonify({'error': ERROR_MESSAGES['unsupported_platform']}), 400
         
+        # Thread của request trước có thể còn thời gian chờ chưa đọc
+        take_waited()
         try:
             # Get video information
             info = get_video_info(video_url, platform, Config.COOKIE_FILE)
@@ -49,7 +57,10 @@ def register_api_routes(app):
             # Include the detected platform in the response
             info['platform'] = platform
             
-            return jsonify(info), 200
+            return jsonify(info), 200, {'X-RateLimit-Wait': str(take_waited())}
+        except RateLimitedError:
+            # Trả 429 qua error handler của app
+            raise
         except Exception as e:
             app.logger.error(f"Preview error for {video_url}: {str(e)}")
             app.logger.error(traceback.format_exc())
@@ -81,64 +92,49 @@ def register_api_routes(app):
         if platform not in SUPPORTED_PLATFORMS:
             return jsonify({'error': ERROR_MESSAGES['unsupported_platform']}), 400
         
-        # Clean expired cache before download
-        clean_expired_cache()
-        
-        try:
-            # Try to download the video
-            start_time = time.time()
-            file_path = download_video(video_url, platform, quality, Config.COOKIE_FILE)
-            download_time = time.time() - start_time
-            
-            # Log download history
-            history = DownloadHistory(
-                user_id=current_user.id,
-                url=video_url,
-                platform=platform,
-                quality=quality,
-                title=video_title,
-                success=True
-            )
-            
-            # Update user download count
-            current_user.increment_download_count()
-            
-            db.session.add(history)
-            db.session.commit()
-            
-            app.logger.info(f"Download successful: {video_url} ({quality}) in {download_time:.2f}s")
-            
-            # Guess safe filename from video title
-            filename = "".join(c if c.isalnum() or c in ['-', '_', '.'] else '_' for c in video_title)
-            filename = f"{filename}.mp4"
-            
-            return send_file(
-                file_path, 
-                as_attachment=True,
-                download_name=filename,
-                mimetype='video/mp4'
-            )
-            
-        except Exception as e:
-            # Log failed download
-            history = DownloadHistory(
-                user_id=current_user.id,
-                url=video_url,
-                platform=platform,
-                quality=quality,
-                title=video_title,
-                success=False
+        # Tải trong worker nền, client theo dõi qua /api/jobs/<job_id>
+        return enqueue_download(video_url, platform, quality, request.form.get('format_id'), video_title)
+    
+    def record_job_history(job):
+        """Log download history when a background job completes"""
+        success = job['status'] == FINISHED
+        if job['user_id'] is not None:
+            # Ghi theo lô cùng các job khác thay vì commit riêng từng dòng
+            record_download(
+                job['user_id'],
+                job['url'],
+                job['platform'],
+                job['quality'],
+                title=job['title'],
+                success=success
             )
+        
+        if success:
+            app.logger.info(f"Download successful: {job['url']} ({job['quality']}) in {job['finished_at'] - job['started_at']:.2f}s")
+        else:
+            app.logger.error(f"Download error for {job['url']}: {job['error']}")
+    
+    register_job_listener(record_job_history)
             
-            db.session.add(history)
-            db.session.commit()
-            
-            app.logger.error(f"Download error for {video_url}: {str(e)}")
-            app.logger.error(traceback.format_exc())
-            
-            return jsonify({
-                'error': str(e) if str(e) else ERROR_MESSAGES['download_failed']
-            }), 500
+    @app.route('/api/cache/metadata', methods=['GET'])
+    @login_required
+    def metadata_cache_stats():
+        """Report hit/miss counters of the shared preview metadata cache"""
+        return jsonify(get_metadata_cache_stats()), 200
+    
+    @app.route('/api/cache/files', methods=['GET'])
+    @login_required
+    def cache_file_stats():
+        """Report size and entry count of the download cache from the catalog"""
+        totals = get_cache_totals()
+        totals['max_size'] = Config.MAX_CACHE_SIZE
+        return jsonify(totals), 200
+    
+    @app.route('/api/cache/single-flight', methods=['GET'])
+    @login_required
+    def single_flight_stats():
+        """Report lock wait time and coalesced requests for downloads and previews"""
+        return jsonify(get_flight_stats()), 200
             
     @app.route('/api/check-cookies', methods=['POST'])
     @login_required
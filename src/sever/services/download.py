@@ -1,7 +1,7 @@
 import os
-import yt_dlp
 from src.config.constants import PLATFORM_DOMAINS
-from src.server.utils.fileManager import get_cache_path
+from src.server.utils.fileManager import get_cache_path, get_postprocess_profile
+from src.server.services.ydlPool import borrow_ydl, download_error
 from src.server.services.youtube import get_youtube_info, get_youtube_download_options
 from src.server.services.facebook import get_facebook_info, get_facebook_download_options
 from src.server.services.tiktok import get_tiktok_info, get_tiktok_download_options
@@ -51,11 +51,11 @@ def download_video(video_url, platform=None, quality='best', cookie_file=None):
         ydl_opts = get_youtube_download_options(quality, cookie_file)
     
     # Set cache path as output
-    cache_path = get_cache_path(video_url, quality)
+    cache_path = get_cache_path(video_url, ydl_opts['format'], get_postprocess_profile(ydl_opts), platform=platform)
     ydl_opts['outtmpl'] = cache_path
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with borrow_ydl(platform, ydl_opts, 'download') as ydl:
             info = ydl.extract_info(video_url, download=True)
             filename = ydl.prepare_filename(info)
             
@@ -68,7 +68,7 @@ def download_video(video_url, platform=None, quality='best', cookie_file=None):
                         break
                         
             return filename
-    except yt_dlp.utils.DownloadError as e:
+    except download_error() as e:
         error_msg = str(e)
         if "This video is unavailable" in error_msg:
             raise ValueError("This video is unavailable or private")